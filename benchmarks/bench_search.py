@@ -0,0 +1,45 @@
+"""Benchmark ranked fuzzy search latency.
+
+Usage::
+
+    python -m benchmarks.bench_search --products 100000
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import make_catalog, timer
+from mcp_service.search_index import FuzzyIndex
+
+QUERIES = ["headphons", "smrt wach", "laptp ultr 42", "desk mni", "wireles premum"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.products)
+    timings: dict = {}
+    with timer(timings, "build"):
+        index = FuzzyIndex(catalog, version=0)
+    print(f"catalog: {args.products:,} products, build: {timings['build']:.2f}s")
+    print(f"{'query':<18} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+
+    for query in QUERIES:
+        index.search(query, limit=args.limit)
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            index.search(query, limit=args.limit)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f"{query:<18} {statistics.median(samples):>10.3f} {p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark scatter-gather search against a single-process scan.
+
+Usage::
+
+    python -m benchmarks.bench_sharding --products 1000000 --shards 1 2 4 8
+"""
+
+import argparse
+import time
+
+from benchmarks.common import make_catalog
+from mcp_service import data
+from mcp_service.sharding import ShardedCatalog
+
+
+def _best_of(repeat: int, func, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--query", default="max 42")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data.PRODUCTS[:] = make_catalog(args.products)
+    data.mark_catalog_changed()
+
+    baseline = _best_of(args.repeat, data.search_products, args.query)
+    print(f"catalog: {args.products:,} products, query: {args.query!r}")
+    print(f"{'shards':>8} {'best (ms)':>12} {'speedup':>10}")
+    print(f"{'inline':>8} {baseline * 1000:>12.1f} {1.0:>10.2f}")
+
+    for num_shards in args.shards:
+        catalog = ShardedCatalog(num_shards)
+        try:
+            catalog.search_products(args.query)  # start workers, load partitions
+            elapsed = _best_of(args.repeat, catalog.search_products, args.query)
+        finally:
+            catalog.close()
+        print(f"{num_shards:>8} {elapsed * 1000:>12.1f} {baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Measure cold-start time of the HTTP service.
+
+Reports, over several fresh interpreters:
+
+- import + ``create_app()`` time, and OpenAPI generation for a first and a
+  second app in the same process;
+- wall time from spawning ``python -m mcp_service`` until ``/health``
+  answers, in the default (auto-reload) mode and with ``--fast-start``;
+- latency of the first fuzzy search once the server answers, which in the
+  default mode still includes building the search index.
+
+Usage::
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_transport import _wait_for
+
+IN_PROCESS = """
+import json, time
+start = time.perf_counter()
+from mcp_service.server import create_app
+app = create_app()
+built = time.perf_counter()
+app.openapi()
+first = time.perf_counter()
+create_app().openapi()
+second = time.perf_counter()
+print(json.dumps({
+    "import_and_create_app": built - start,
+    "openapi_first": first - built,
+    "openapi_cached": second - first,
+}))
+"""
+
+
+def _in_process(runs: int) -> dict:
+    samples: dict = {}
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", IN_PROCESS])
+        for name, value in json.loads(output).items():
+            samples.setdefault(name, []).append(value)
+    return samples
+
+
+def _serve(port: int, fast_start: bool) -> tuple:
+    start = time.perf_counter()
+    command = [sys.executable, "-m", "mcp_service", "--host", "127.0.0.1"]
+    command += ["--port", str(port)] + (["--fast-start"] if fast_start else [])
+    process = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for(f"http://127.0.0.1:{port}/health")
+        ready = time.perf_counter() - start
+        search_start = time.perf_counter()
+        httpx.get(
+            f"http://127.0.0.1:{port}/api/v1/products/search",
+            params={"query": "macbok", "mode": "fuzzy"},
+        ).raise_for_status()
+        return ready, time.perf_counter() - search_start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _report(name: str, samples: list) -> None:
+    samples = [s * 1000 for s in samples]
+    print(f"{name:<34} {statistics.median(samples):>9.1f} {max(samples):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    print(f"{'measurement':<34} {'p50 (ms)':>9} {'max (ms)':>9}")
+    for name, samples in _in_process(args.runs).items():
+        _report(name, samples)
+
+    for fast_start in (False, True):
+        label = "--fast-start" if fast_start else "default"
+        ready, first_search = zip(
+            *(_serve(args.port, fast_start) for _ in range(args.runs))
+        )
+        _report(f"spawn to /health ({label})", ready)
+        _report(f"first fuzzy search ({label})", first_search)
+
+
+if __name__ == "__main__":
+    main()
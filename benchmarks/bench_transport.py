@@ -0,0 +1,128 @@
+"""Compare tool-call latency: JSON-over-POST vs native MCP sessions.
+
+Starts the service in subprocesses and issues sequential ``check_inventory``
+calls over ``POST /api/v1/mcp/message`` (one HTTP request per call, with and
+without connection reuse), the SDK stdio transport and the SDK
+streamable-HTTP transport (one long-lived session each).
+
+Usage::
+
+    python -m benchmarks.bench_transport --calls 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+ARGS = {"product_id": "3"}
+
+
+def _start(transport: str, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "mcp_service", "--transport", transport]
+        + ["--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _wait_for(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=0.5)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def _report(name: str, samples: list) -> None:
+    samples = sorted(s * 1000 for s in samples)
+    p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+    print(f"{name:<28} {statistics.median(samples):>9.3f} {p99:>9.3f}")
+
+
+async def _session_calls(session: ClientSession, calls: int) -> list:
+    await session.initialize()
+    await session.call_tool("check_inventory", ARGS)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await session.call_tool("check_inventory", ARGS)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def bench_stdio(calls: int) -> list:
+    params = StdioServerParameters(
+        command=sys.executable, args=["-m", "mcp_service", "--transport", "stdio"]
+    )
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                return await _session_calls(session, calls)
+
+
+async def bench_streamable_http(url: str, calls: int) -> list:
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            return await _session_calls(session, calls)
+
+
+def bench_post(url: str, calls: int, reuse: bool) -> list:
+    body = {"id": 1, "method": "check_inventory", "params": ARGS}
+    samples = []
+    with httpx.Client() as client:
+        for _ in range(calls + 1):
+            start = time.perf_counter()
+            if reuse:
+                client.post(url, json=body)
+            else:
+                httpx.post(url, json=body)
+            samples.append(time.perf_counter() - start)
+    return samples[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'transport':<28} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+
+    http = _start("http", args.port)
+    try:
+        _wait_for(f"http://127.0.0.1:{args.port}/health")
+        url = f"http://127.0.0.1:{args.port}/api/v1/mcp/message"
+        _report("POST /mcp/message (new conn)", bench_post(url, args.calls, False))
+        _report("POST /mcp/message (keep-alive)", bench_post(url, args.calls, True))
+    finally:
+        http.terminate()
+        http.wait()
+
+    _report("SDK stdio session", asyncio.run(bench_stdio(args.calls)))
+
+    streamable = _start("streamable-http", args.port + 1)
+    try:
+        base = f"http://127.0.0.1:{args.port + 1}"
+        _wait_for(f"{base}/mcp")
+        samples = asyncio.run(bench_streamable_http(f"{base}/mcp", args.calls))
+        _report("SDK streamable-HTTP session", samples)
+    finally:
+        streamable.terminate()
+        streamable.wait()
+
+
+if __name__ == "__main__":
+    main()
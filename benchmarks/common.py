@@ -0,0 +1,48 @@
+"""Shared helpers for the benchmark scripts."""
+
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+ADJECTIVES = ["Pro", "Air", "Max", "Mini", "Ultra", "Lite", "Classic", "Smart"]
+NOUNS = ["Phone", "Laptop", "Shoes", "Coffee Maker", "Headphones", "Watch", "Desk"]
+CATEGORIES = ["Electronics", "Footwear", "Appliances", "Furniture", "Audio"]
+WORDS = [
+    "lightweight",
+    "durable",
+    "wireless",
+    "premium",
+    "compact",
+    "professional",
+    "running",
+    "titanium",
+    "battery",
+    "design",
+    "classic",
+    "grade",
+]
+
+
+def make_catalog(size: int, seed: int = 42) -> List[dict]:
+    """Generate a synthetic catalog shaped like ``data.PRODUCTS``."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": str(i),
+            "name": f"{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {i % 1000}",
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(5, 2500), 2),
+            "stock": rng.randint(0, 200),
+            "description": " ".join(rng.choices(WORDS, k=8)),
+        }
+        for i in range(size)
+    ]
+
+
+@contextmanager
+def timer(results: dict, name: str) -> Iterator[None]:
+    """Store the wall time of the block in ``results[name]`` (seconds)."""
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
@@ -0,0 +1,355 @@
+"""Admission control, per-client rate limiting and load shedding.
+
+Requests to the API pass three gates before reaching a handler:
+
+1. A token bucket per client key (``X-Client-Key`` header, else the client
+   address) limits each client's request rate.
+2. A global concurrency cap bounds how many requests run at once; excess
+   requests wait in a bounded queue for at most ``max_wait`` seconds.
+3. The queue has priority lanes. Cheap point lookups (``ping``,
+   ``check_inventory``...) are woken before filtered searches, which are
+   woken before broad unfiltered scans. When the queue is full, a new
+   request can displace a waiting request from a lower-priority lane.
+
+Rejected requests fail fast with ``429``; MCP messages also carry a
+JSON-RPC error body with the request ``id``.
+
+The MCP WebSocket gets the same treatment: opening a connection takes a
+token from the client's bucket (a rate-limited handshake is refused), and
+every frame takes a token and a concurrency slot for as long as it runs.
+Rejected frames are answered with the same JSON-RPC error.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from mcp_service.compression import read_body
+
+HIGH, NORMAL, LOW = 0, 1, 2
+LANE_NAMES = ("high", "normal", "low")
+
+HIGH_PRIORITY_METHODS = frozenset(
+    {"ping", "capabilities", "check_inventory", "get_product_details"}
+)
+OVERLOADED_CODE = -32000
+
+
+def classify_mcp(method: str, params: dict) -> int:
+    """Return the priority lane for an MCP method call."""
+    if method in HIGH_PRIORITY_METHODS:
+        return HIGH
+    if method == "search_products" and not (
+        params.get("query") or params.get("category")
+    ):
+        return LOW
+    if method == "facets" and params.get("query"):
+        return LOW
+    return NORMAL
+
+
+def classify_rest(path: str, query_string: bytes) -> int:
+    """Return the priority lane for a REST request."""
+    if path.endswith("/search") or path.endswith("/facets"):
+        filtered = b"query=" in query_string or b"category=" in query_string
+        return NORMAL if filtered else LOW
+    if path.startswith("/api/v1/products/") or path.endswith("/capabilities"):
+        return HIGH
+    return NORMAL
+
+
+def overloaded_error(request_id, message: str) -> dict:
+    """JSON-RPC error response for a rejected MCP request."""
+    return {
+        "id": request_id,
+        "result": None,
+        "error": {"code": OVERLOADED_CODE, "message": message},
+    }
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next token is available."""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Token buckets keyed by client, with idle buckets pruned."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def allow(self, key: str) -> Tuple[bool, float]:
+        """Take a token for ``key``; returns (allowed, retry_after)."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._prune()
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        if bucket.try_acquire():
+            return True, 0.0
+        return False, bucket.retry_after()
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key, bucket in list(self._buckets.items()):
+            # A bucket that would have refilled completely carries no state
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst:
+                del self._buckets[key]
+
+
+class PriorityLimiter:
+    """Global concurrency cap with a bounded, prioritized wait queue."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._lanes: List[Deque[asyncio.Future]] = [deque() for _ in LANE_NAMES]
+
+    @property
+    def queued(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    def _shed_lower(self, lane: int) -> bool:
+        """Reject the newest waiter from the lowest lane below ``lane``."""
+        for lower in range(len(self._lanes) - 1, lane, -1):
+            while self._lanes[lower]:
+                waiter = self._lanes[lower].pop()
+                if not waiter.done():
+                    waiter.set_result(False)
+                    return True
+        return False
+
+    async def acquire(self, lane: int) -> bool:
+        """Wait for a slot; returns False if the request should be shed."""
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            return True
+        if self.queued >= self.max_queue and not self._shed_lower(lane):
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append(waiter)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted a slot just as the wait expired
+                return waiter.result()
+            waiter.cancel()
+            self._lanes[lane].remove(waiter)
+            return False
+        except asyncio.CancelledError:
+            # The client went away while queued; never strand a granted slot
+            if not waiter.done():
+                waiter.cancel()
+                self._lanes[lane].remove(waiter)
+            elif waiter.result():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot and hand it to the highest-priority waiter."""
+        for lane in self._lanes:
+            while lane:
+                waiter = lane.popleft()
+                if not waiter.done():
+                    waiter.set_result(True)
+                    return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Rate limiter and concurrency limiter plus counters."""
+
+    def __init__(
+        self,
+        rate: float = 50.0,
+        burst: float = 100.0,
+        max_concurrency: int = 64,
+        max_queue: int = 256,
+        max_wait: float = 1.0,
+    ):
+        self.rate_limiter = RateLimiter(rate, burst) if rate > 0 else None
+        self.limiter = PriorityLimiter(max_concurrency, max_queue, max_wait)
+        self.admitted = [0] * len(LANE_NAMES)
+        self.rate_limited = 0
+        self.shed = [0] * len(LANE_NAMES)
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build a controller from the environment.
+
+        ``MCP_RATE_LIMIT`` (requests per second per client, ``0`` disables),
+        ``MCP_RATE_BURST``, ``MCP_MAX_CONCURRENCY``, ``MCP_MAX_QUEUE`` and
+        ``MCP_QUEUE_TIMEOUT`` (seconds) override the defaults.
+        """
+        return cls(
+            rate=float(os.environ.get("MCP_RATE_LIMIT", 50)),
+            burst=float(os.environ.get("MCP_RATE_BURST", 100)),
+            max_concurrency=int(os.environ.get("MCP_MAX_CONCURRENCY", 64)),
+            max_queue=int(os.environ.get("MCP_MAX_QUEUE", 256)),
+            max_wait=float(os.environ.get("MCP_QUEUE_TIMEOUT", 1.0)),
+        )
+
+    async def admit(self, key: str, lane: int) -> Optional[Tuple[str, float]]:
+        """Rate limit ``key`` and wait for a concurrency slot in ``lane``.
+
+        Returns None once admitted, and the caller must then call
+        :meth:`release`. Otherwise returns ``(reason, retry_after)``.
+        """
+        allowed, retry_after = self.allow(key)
+        if not allowed:
+            return "Rate limit exceeded", retry_after
+        if not await self.limiter.acquire(lane):
+            self.shed[lane] += 1
+            return "Server overloaded", self.limiter.max_wait
+        self.admitted[lane] += 1
+        return None
+
+    def allow(self, key: str) -> Tuple[bool, float]:
+        """Take a token for ``key`` without taking a concurrency slot."""
+        if self.rate_limiter is None:
+            return True, 0.0
+        allowed, retry_after = self.rate_limiter.allow(key)
+        if not allowed:
+            self.rate_limited += 1
+        return allowed, retry_after
+
+    def release(self) -> None:
+        """Free the slot taken by a successful :meth:`admit`."""
+        self.limiter.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.limiter.active,
+            "queued": self.limiter.queued,
+            "rate_limited": self.rate_limited,
+            "admitted": dict(zip(LANE_NAMES, self.admitted)),
+            "shed": dict(zip(LANE_NAMES, self.shed)),
+        }
+
+
+def client_key(scope: Scope) -> str:
+    """Identify the caller for rate limiting."""
+    key = Headers(scope=scope).get("x-client-key")
+    if key:
+        return key
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to API routes."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        prefix: str = "/api/v1/",
+        mcp_path: str = "/api/v1/mcp/message",
+    ):
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix
+        self.mcp_path = mcp_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+
+        controller = self.controller
+        is_mcp = scope["path"] == self.mcp_path and scope["method"] == "POST"
+        request_id = None
+        if is_mcp:
+            body, receive = await read_body(receive)
+            try:
+                message = json.loads(body)
+                request_id = message.get("id")
+                lane = classify_mcp(
+                    message.get("method", ""), message.get("params") or {}
+                )
+            except (ValueError, AttributeError):
+                lane = NORMAL
+        else:
+            lane = classify_rest(scope["path"], scope["query_string"])
+
+        rejection = await controller.admit(client_key(scope), lane)
+        if rejection is not None:
+            await self._reject(send, is_mcp, request_id, *rejection)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
+
+    async def _websocket(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Rate limit the handshake; frames are admitted by the handler."""
+        allowed, _ = self.controller.allow(client_key(scope))
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+        message = await receive()
+        if message["type"] == "websocket.connect":
+            # Closing before accepting refuses the handshake (HTTP 403)
+            await send({"type": "websocket.close", "code": 1013})
+
+    async def _reject(
+        self,
+        send: Send,
+        is_mcp: bool,
+        request_id,
+        message: str,
+        retry_after: float,
+    ) -> None:
+        if is_mcp:
+            payload = overloaded_error(request_id, message)
+        else:
+            payload = {"detail": message}
+        body = json.dumps(payload).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, round(retry_after))).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
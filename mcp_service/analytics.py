@@ -0,0 +1,228 @@
+"""Hot-query analytics and adaptive precomputation.
+
+Every ``search_products`` call is counted in a count-min sketch, which
+estimates how often any query was seen in fixed memory. Alongside it a
+small heavy-hitters table keeps the top-N queries (and category filters)
+by estimated count. Memory is bounded by the sketch size and N no matter
+how many distinct queries arrive.
+
+The hottest queries are then precomputed and pinned: their results are
+kept for the current content version (see ``data.content_version``; search
+results never include stock) and served without running the search. When
+the catalog content changes, pinned results are recomputed in the
+background for the new version.
+"""
+
+import asyncio
+import os
+import time
+from array import array
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp_service import data
+
+# Longer keys (huge query strings) are not tracked
+MAX_KEY_LENGTH = 512
+
+
+class CountMinSketch:
+    """Approximate counts in ``width * depth`` counters.
+
+    Estimates never undercount; they overcount by at most ``2N / width``
+    with probability ``1 - 0.5 ** depth`` for ``N`` total events.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and return its new estimate."""
+        estimate = None
+        for seed, row in enumerate(self._rows):
+            slot = hash((seed, key)) % self.width
+            row[slot] += count
+            if estimate is None or row[slot] < estimate:
+                estimate = row[slot]
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(
+            row[hash((seed, key)) % self.width] for seed, row in enumerate(self._rows)
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(row.itemsize * len(row) for row in self._rows)
+
+
+class HeavyHitters:
+    """Top-N keys by count-min estimate."""
+
+    def __init__(self, capacity: int = 50, width: int = 2048, depth: int = 4):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.total = 0
+        self._top: Dict[str, int] = {}
+        # Lower bound on the smallest tracked count; estimates only grow
+        self._floor = 0
+
+    def add(self, key: str) -> None:
+        self.total += 1
+        estimate = self.sketch.add(key)
+        top = self._top
+        if key in top or len(top) < self.capacity:
+            top[key] = estimate
+            return
+        if estimate <= self._floor:
+            return
+        smallest = min(top, key=top.__getitem__)
+        if estimate > top[smallest]:
+            del top[smallest]
+            top[key] = estimate
+        self._floor = min(top.values())
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Tracked keys, most frequent first."""
+        ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+
+class _Pin:
+    __slots__ = ("version", "result", "hits")
+
+    def __init__(self, version: int, result: dict):
+        self.version = version
+        self.result = result
+        self.hits = 0
+
+
+class HotQueries:
+    """Query statistics plus pinned results for the hottest queries.
+
+    ``compute`` runs a query given its key (normalized params JSON) and
+    returns the MCP result for it with the content version that result
+    reflects. That version can lag ``data.content_version()`` while a
+    search index is rebuilt; such a pin is not served and is recomputed by
+    a later refresh.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[str], Awaitable[Tuple[dict, int]]],
+        top_n: int = 50,
+        pin_count: int = 10,
+        min_count: int = 20,
+        refresh_every: int = 1000,
+        min_refresh_interval: float = 1.0,
+    ):
+        self.compute = compute
+        self.pin_count = pin_count
+        self.min_count = min_count
+        self.refresh_every = refresh_every
+        self.min_refresh_interval = min_refresh_interval
+        self.queries = HeavyHitters(top_n)
+        self.categories = HeavyHitters(top_n)
+        self.pins: Dict[str, _Pin] = {}
+        self.pin_hits = 0
+        self.refreshes = 0
+        self._since_refresh = 0
+        self._last_refresh = 0.0
+        self._refreshing = False
+
+    @classmethod
+    def from_env(
+        cls, compute: Callable[[str], Awaitable[Tuple[dict, int]]]
+    ) -> "HotQueries":
+        """Build from the environment.
+
+        ``MCP_PIN_HOT_QUERIES`` sets how many of the hottest queries are
+        pinned; ``0`` disables pinning.
+        """
+        return cls(compute, pin_count=int(os.environ.get("MCP_PIN_HOT_QUERIES", 10)))
+
+    def record(self, key: str, category: str = "") -> Optional[dict]:
+        """Count a query; return its pinned result if one is current."""
+        if len(key) <= MAX_KEY_LENGTH:
+            self.queries.add(key)
+        if category:
+            self.categories.add(category[:MAX_KEY_LENGTH])
+        self._since_refresh += 1
+        self._maybe_refresh()
+
+        pin = self.pins.get(key)
+        if pin is not None and pin.version == data.content_version():
+            pin.hits += 1
+            self.pin_hits += 1
+            return pin.result
+        return None
+
+    def _maybe_refresh(self) -> None:
+        if self._refreshing or not self.pin_count:
+            return
+        due = self._since_refresh >= self.refresh_every
+        if not due and self.pins:
+            # Re-precompute pins for a new catalog version, but not on
+            # every write of a write-heavy burst
+            version = data.content_version()
+            due = any(pin.version != version for pin in self.pins.values()) and (
+                time.monotonic() - self._last_refresh >= self.min_refresh_interval
+            )
+        if due:
+            self._refreshing = True
+            task = asyncio.get_running_loop().create_task(self.refresh())
+            # A failed refresh keeps the previous pins; mark it retrieved
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def refresh(self) -> None:
+        """Precompute results for the current hottest queries."""
+        self._refreshing = True
+        try:
+            hot = [
+                key
+                for key, count in self.queries.top(self.pin_count)
+                if count >= self.min_count
+            ]
+            version = data.content_version()
+            pins = {}
+            for key in hot:
+                pin = self.pins.get(key)
+                if pin is None or pin.version != version:
+                    result, computed_version = await self.compute(key)
+                    pin = _Pin(computed_version, result)
+                pins[key] = pin
+            self.pins = pins
+            self.refreshes += 1
+        finally:
+            self._since_refresh = 0
+            self._last_refresh = time.monotonic()
+            self._refreshing = False
+
+    def stats(self, limit: int = 20) -> dict:
+        version = data.content_version()
+        return {
+            "total_queries": self.queries.total,
+            "top_queries": [
+                {"query": key, "estimated_count": count}
+                for key, count in self.queries.top(limit)
+            ],
+            "top_categories": [
+                {"category": key, "estimated_count": count}
+                for key, count in self.categories.top(limit)
+            ],
+            "pinned": [
+                {
+                    "query": key,
+                    "catalog_version": pin.version,
+                    "current": pin.version == version,
+                    "hits": pin.hits,
+                }
+                for key, pin in self.pins.items()
+            ],
+            "pin_hits": self.pin_hits,
+            "refreshes": self.refreshes,
+            "sketch_bytes": (
+                self.queries.sketch.memory_bytes + self.categories.sketch.memory_bytes
+            ),
+        }
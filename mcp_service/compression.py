@@ -0,0 +1,302 @@
+"""Negotiated response compression with a pre-compressed response cache.
+
+``CompressionMiddleware`` compresses responses at or above a size threshold
+with the best encoding the client accepts: zstd or brotli when the optional
+``zstandard`` / ``brotli`` packages are installed, otherwise gzip. Bodies
+are compressed and sent in chunks rather than as one large buffer.
+
+Responses for hot read paths (search and facets) are kept in an LRU cache
+already compressed, keyed on the request, the encoding and the catalog
+version, so repeated identical queries skip both the handler and the
+compressor. Responses marked ``Cache-Control: no-store`` are not stored.
+MCP messages are not cached: every tool call must reach the dispatcher,
+which counts searches for hot-query analytics and coalesces identical
+concurrent calls itself.
+"""
+
+import hashlib
+import zlib
+from collections import OrderedDict
+from importlib.util import find_spec
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from mcp_service import data
+
+Encoder = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+CACHEABLE_PATHS = (
+    "/api/v1/products/search",
+    "/api/v1/products/facets",
+)
+
+
+def _gzip() -> Encoder:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return compressor.compress, compressor.flush
+
+
+def _zstd() -> Encoder:
+    # The optional codecs are imported on first use to keep startup fast
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return compressor.compress, compressor.flush
+
+
+def _brotli() -> Encoder:
+    import brotli
+
+    compressor = brotli.Compressor(quality=4)
+    return compressor.process, compressor.finish
+
+
+# Server preference order, best first. find_spec checks that an optional
+# codec is installed without importing it.
+ENCODERS: Dict[str, Callable[[], Encoder]] = {}
+if find_spec("zstandard") is not None:
+    ENCODERS["zstd"] = _zstd
+if find_spec("brotli") is not None:
+    ENCODERS["br"] = _brotli
+ENCODERS["gzip"] = _gzip
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the encoding to use for an ``Accept-Encoding`` header value."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for name in ENCODERS:
+        quality = weights.get(name, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class _CachedResponse:
+    __slots__ = ("status", "headers", "chunks", "size")
+
+    def __init__(self, status: int, headers: list, chunks: List[bytes]):
+        self.status = status
+        self.headers = headers
+        self.chunks = chunks
+        self.size = sum(len(chunk) for chunk in chunks)
+
+
+class CompressedResponseCache:
+    """LRU of compressed responses bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, _CachedResponse]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: tuple) -> Optional[_CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: tuple, entry: _CachedResponse) -> None:
+        if entry.size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+async def read_body(receive: Receive) -> Tuple[bytes, Receive]:
+    """Read the full request body and return a receive that replays it."""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+class CompressionMiddleware:
+    """ASGI middleware for negotiated, chunked, cache-aware compression."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        chunk_size: int = 64 * 1024,
+        cache: Optional[CompressedResponseCache] = None,
+        cacheable_paths: Tuple[str, ...] = CACHEABLE_PATHS,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.cacheable_paths = cacheable_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = None
+        if self.cache is not None and scope["path"] in self.cacheable_paths:
+            body, receive = await read_body(receive)
+            cache_key = (
+                scope["method"],
+                scope["path"],
+                scope["query_string"],
+                hashlib.blake2b(body, digest_size=16).digest(),
+                encoding,
+                data.catalog_version(),
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": cached.status,
+                        "headers": cached.headers,
+                    }
+                )
+                for chunk in cached.chunks:
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        responder = _CompressingResponder(self, encoding, send, cache_key)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Per-response state: decides on compression at the first body chunk."""
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        encoding: str,
+        send: Send,
+        cache_key: Optional[tuple],
+    ):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.cache_key = cache_key
+        self.start: Optional[Message] = None
+        self.encoder: Optional[Encoder] = None
+        self.passthrough = False
+        self.chunks: Optional[List[bytes]] = [] if cache_key is not None else None
+        self.cached_size = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            if "content-encoding" in headers or (
+                not more_body and len(body) < self.middleware.minimum_size
+            ):
+                self.passthrough = True
+                headers.add_vary_header("Accept-Encoding")
+                await self.downstream(self.start)
+                await self.downstream(message)
+                return
+            del headers["content-length"]
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            self.encoder = ENCODERS[self.encoding]()
+            await self.downstream(self.start)
+
+        compress, flush = self.encoder
+        step = self.middleware.chunk_size
+        for offset in range(0, len(body), step):
+            await self._emit(compress(body[offset : offset + step]))
+        if more_body:
+            return
+
+        await self._emit(flush())
+        await self.downstream({"type": "http.response.body", "body": b""})
+        self._store()
+
+    async def _emit(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        if self.chunks is not None:
+            self.chunks.append(chunk)
+        await self.downstream(
+            {"type": "http.response.body", "body": chunk, "more_body": True}
+        )
+
+    def _store(self) -> None:
+        cache = self.middleware.cache
+        if cache is None or self.chunks is None or self.start["status"] != 200:
+            return
+        # Handlers mark responses that must not outlive the request, such as
+        # results from an index that is still being rebuilt
+        cache_control = Headers(raw=self.start["headers"]).get("cache-control", "")
+        if "no-store" in cache_control:
+            return
+        headers = [
+            (name, value)
+            for name, value in self.start["headers"]
+            if name.lower() != b"server-timing"
+        ]
+        cache.put(self.cache_key, _CachedResponse(200, headers, self.chunks))
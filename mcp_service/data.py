@@ -1,5 +1,9 @@
 """Product database for the MCP service."""
 
+import heapq
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
 # Our fake product database
 PRODUCTS = [
     {
@@ -36,50 +40,236 @@ PRODUCTS = [
     },
 ]
 
+# Bumped whenever PRODUCTS changes so derived state knows it is stale
+_catalog_version = 0
+# Bumped for every change except stock-only updates; search indexes and
+# worker snapshots, which never read stock, only rebuild when this changes
+_content_version = 0
+_id_index: Dict[str, dict] = {}
+_id_index_version = -1
 
-def search_products(query: str = "", category: str = "") -> list:
-    """Search for products by name or category"""
-    results = []
+PRODUCT_FIELDS = ("id", "name", "category", "price", "stock", "description")
 
-    for product in PRODUCTS:
+# Called as listener(old, new) after every mutation; old is None for inserts
+# and new is None for removals
+CatalogListener = Callable[[Optional[dict], Optional[dict]], None]
+_listeners: List[CatalogListener] = []
+
+# Called before every mutation; raising vetoes the change, e.g. when the
+# write-ahead log can no longer record it
+CatalogGuard = Callable[[], None]
+_guards: List[CatalogGuard] = []
+
+
+def catalog_version() -> int:
+    """Get the current catalog version"""
+    return _catalog_version
+
+
+def content_version() -> int:
+    """Get the version of the catalog ignoring stock levels"""
+    return _content_version
+
+
+def mark_catalog_changed() -> None:
+    """Record that PRODUCTS was modified in place"""
+    global _catalog_version, _content_version
+    _catalog_version += 1
+    _content_version += 1
+
+
+def is_stock_change(old: Optional[dict], new: Optional[dict]) -> bool:
+    """Whether a change only touched a product's stock level"""
+    if old is None or new is None:
+        return False
+    return all(old[field] == new[field] for field in PRODUCT_FIELDS if field != "stock")
+
+
+def load_products(products: List[dict]) -> None:
+    """Replace the whole catalog, e.g. with state recovered from disk"""
+    PRODUCTS[:] = products
+    mark_catalog_changed()
+
+
+def _product_by_id(product_id: str):
+    """Look up a product through the id index, rebuilding it if stale"""
+    global _id_index, _id_index_version
+    if _id_index_version != _catalog_version or len(_id_index) != len(PRODUCTS):
+        _id_index = {product["id"]: product for product in PRODUCTS}
+        _id_index_version = _catalog_version
+    return _id_index.get(product_id)
+
+
+def add_catalog_listener(listener: CatalogListener) -> None:
+    """Register a callback for catalog mutations"""
+    _listeners.append(listener)
+
+
+def remove_catalog_listener(listener: CatalogListener) -> None:
+    """Unregister a catalog mutation callback"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def add_catalog_guard(guard: CatalogGuard) -> None:
+    """Register a check that runs before every catalog mutation"""
+    _guards.append(guard)
+
+
+def remove_catalog_guard(guard: CatalogGuard) -> None:
+    """Unregister a pre-mutation check"""
+    if guard in _guards:
+        _guards.remove(guard)
+
+
+def _check_guards() -> None:
+    for guard in list(_guards):
+        guard()
+
+
+def _apply_change(old: Optional[dict], stored: Optional[dict]) -> None:
+    """Bump the versions, keep the id index current and notify listeners"""
+    global _catalog_version, _content_version, _id_index_version
+    index_current = _id_index_version == _catalog_version
+    _catalog_version += 1
+    if not is_stock_change(old, stored):
+        _content_version += 1
+    if index_current:
+        if stored is not None:
+            _id_index[stored["id"]] = stored
+        elif old is not None:
+            _id_index.pop(old["id"], None)
+        _id_index_version = _catalog_version
+
+    # Every listener sees the change even if an earlier one fails
+    new = dict(stored) if stored is not None else None
+    error: Optional[BaseException] = None
+    for listener in list(_listeners):
+        try:
+            listener(old, new)
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+
+
+def upsert_product(product: dict) -> dict:
+    """Add a product, or replace the product with the same id"""
+    missing = [field for field in PRODUCT_FIELDS if field not in product]
+    if missing:
+        raise ValueError(f"Missing product fields: {', '.join(missing)}")
+
+    _check_guards()
+    existing = _product_by_id(product["id"])
+    if existing is None:
+        stored = dict(product)
+        PRODUCTS.append(stored)
+        _apply_change(None, stored)
+        return stored
+
+    old = dict(existing)
+    # Update in one step rather than clear() and refill: index builds read
+    # product dicts from other threads and must never see them empty
+    existing.update(product)
+    for field in existing.keys() - product.keys():
+        del existing[field]
+    _apply_change(old, existing)
+    return existing
+
+
+def update_stock(product_id: str, stock: int) -> dict:
+    """Set the stock level for a product"""
+    product = _product_by_id(product_id)
+    if product is None:
+        return {"error": "Product not found"}
+
+    _check_guards()
+    old = dict(product)
+    product["stock"] = stock
+    _apply_change(old, product)
+    return product
+
+
+def remove_product(product_id: str) -> dict:
+    """Remove a product from the catalog"""
+    product = _product_by_id(product_id)
+    if product is None:
+        return {"error": "Product not found"}
+
+    _check_guards()
+    PRODUCTS.remove(product)
+    _apply_change(dict(product), None)
+    return product
+
+
+SORT_FIELDS = ("price", "name")
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """Split a sort spec like "-price" into (field, descending)"""
+    field = sort.lstrip("-")
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field: {sort}")
+    return field, sort.startswith("-")
+
+
+def search_products(
+    query: str = "", category: str = "", sort: str = "", limit: Optional[int] = None
+) -> list:
+    """Search for products by name or category
+
+    Results are in catalog order unless ``sort`` names a field ("price",
+    "name", prefixed with "-" for descending). Ties keep catalog order.
+    """
+    needle = query.lower()
+    wanted = category.lower()
+    results = (
+        {
+            "id": product["id"],
+            "name": product["name"],
+            "category": product["category"],
+            "price": product["price"],
+        }
+        for product in PRODUCTS
         # Search by name or category
-        name_match = query.lower() in product["name"].lower() if query else True
-        category_match = (
-            category.lower() == product["category"].lower() if category else True
-        )
+        if (not needle or needle in product["name"].lower())
+        and (not wanted or wanted == product["category"].lower())
+    )
+
+    return order_results(results, sort, limit)
 
-        if name_match and category_match:
-            results.append(
-                {
-                    "id": product["id"],
-                    "name": product["name"],
-                    "category": product["category"],
-                    "price": product["price"],
-                }
-            )
 
-    return results
+def order_results(results: Iterable[dict], sort: str = "", limit: Optional[int] = None):
+    """Apply a sort spec and limit to search results in catalog order"""
+    if not sort:
+        return list(islice(results, limit))
+
+    field, descending = parse_sort(sort)
+    if limit is None:
+        return sorted(results, key=lambda p: p[field], reverse=descending)
+    select = heapq.nlargest if descending else heapq.nsmallest
+    return select(limit, results, key=lambda p: p[field])
 
 
 def get_product_details(product_id: str) -> dict:
     """Get detailed information about a specific product"""
-    for product in PRODUCTS:
-        if product["id"] == product_id:
-            return product
+    product = _product_by_id(product_id)
+    if product is not None:
+        return product
 
     return {"error": "Product not found"}
 
 
 def check_inventory(product_id: str) -> dict:
     """Check stock levels for a product"""
-    for product in PRODUCTS:
-        if product["id"] == product_id:
-            return {
-                "product_id": product_id,
-                "product_name": product["name"],
-                "stock": product["stock"],
-                "in_stock": product["stock"] > 0,
-            }
+    product = _product_by_id(product_id)
+    if product is not None:
+        return {
+            "product_id": product_id,
+            "product_name": product["name"],
+            "stock": product["stock"],
+            "in_stock": product["stock"] > 0,
+        }
 
     return {"error": "Product not found"}
 
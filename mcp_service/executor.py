@@ -0,0 +1,292 @@
+"""Execution layer that keeps CPU-heavy catalog work off the event loop.
+
+Cheap operations run inline. Operations whose estimated cost exceeds a
+threshold (full catalog scans) are sent to a thread pool, to a process
+pool whose workers hold a snapshot of the catalog for the current content
+version, or scattered across a sharded catalog (see ``sharding``). Worker
+snapshots are only used for searches, which never read stock, so
+stock-only updates do not replace them.
+
+Search indexes derived from the catalog, and the sharded catalog itself,
+are rebuilt off the event loop by ``IndexCache``, which keeps serving the
+previous one until the new one is ready.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
+
+from mcp_service import data
+
+T = TypeVar("T")
+
+OFFLOAD_MODES = ("inline", "thread", "process", "sharded")
+DEFAULT_COST_THRESHOLD = 5000
+
+
+def estimate_search_cost(query: str = "", category: str = "") -> int:
+    """Estimate the cost of a search as the number of products scanned."""
+    return len(data.PRODUCTS)
+
+
+def _load_catalog(products: List[dict], version: int) -> None:
+    """Process pool initializer: install the catalog snapshot in the worker."""
+    data.PRODUCTS[:] = products
+    data._catalog_version = data._content_version = version
+
+
+def _call(func_name: str, *args: Any) -> Any:
+    """Run a ``mcp_service.data`` function by name inside a worker."""
+    return getattr(data, func_name)(*args)
+
+
+class Offloader:
+    """Decide per call whether to run inline or in a worker pool."""
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        cost_threshold: int = DEFAULT_COST_THRESHOLD,
+        num_shards: int = 4,
+    ):
+        if mode not in OFFLOAD_MODES:
+            raise ValueError(f"Unknown offload mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.cost_threshold = cost_threshold
+        self.num_shards = num_shards
+        self._executor: Optional[Executor] = None
+        self._executor_version = -1
+        self._threads: Optional[Executor] = None
+        self._sharded: IndexCache = IndexCache(self._build_shards, retire=_close)
+
+    def _get_executor(self) -> Executor:
+        if self.mode == "thread":
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="mcp-offload"
+                )
+            return self._executor
+
+        # Process workers hold a catalog snapshot; replace the pool when the
+        # catalog content changes. With the fork start method the snapshot pages are
+        # shared copy-on-write between workers.
+        # Imported here: multiprocessing is only needed in process mode and
+        # noticeably adds to startup time.
+        from concurrent.futures import ProcessPoolExecutor
+
+        version = data.content_version()
+        if self._executor is None or self._executor_version != version:
+            if self._executor is not None:
+                # Searches already submitted finish on the old pool
+                threading.Thread(
+                    target=self._executor.shutdown, name="mcp-offload-retire"
+                ).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_load_catalog,
+                initargs=(list(data.PRODUCTS), version),
+            )
+            self._executor_version = version
+        return self._executor
+
+    def _get_threads(self) -> Executor:
+        """Thread pool for work that needs this process's in-memory state."""
+        if self.mode == "thread":
+            return self._get_executor()
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="mcp-offload"
+            )
+        return self._threads
+
+    def _build_shards(self, products: List[dict], version: int):
+        from mcp_service.sharding import ShardedCatalog
+
+        sharded = ShardedCatalog(self.num_shards, products, version)
+        try:
+            sharded.start()
+        except BaseException:
+            sharded.close()
+            raise
+        return sharded
+
+    def should_offload(self, cost: int) -> bool:
+        """Whether an operation of the given cost leaves the event loop."""
+        return self.mode != "inline" and cost > self.cost_threshold
+
+    async def run(self, cost: int, func: Callable, *args: Any) -> Any:
+        """Run a ``mcp_service.data`` function, offloading it if expensive."""
+        if not self.should_offload(cost):
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        if self.mode == "process":
+            return await loop.run_in_executor(
+                self._get_executor(), _call, func.__name__, *args
+            )
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def run_local(self, cost: int, func: Callable, *args: Any) -> Any:
+        """Run any callable, offloading it to a thread if expensive.
+
+        Unlike :meth:`run`, ``func`` never leaves this process, so it can
+        use state that worker processes do not have, such as search indexes.
+        """
+        if not self.should_offload(cost):
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_threads(), func, *args)
+
+    async def search_products(
+        self,
+        query: str = "",
+        category: str = "",
+        sort: str = "",
+        limit: Optional[int] = None,
+    ) -> list:
+        """Search the catalog, offloading broad scans."""
+        results, _ = await self.search_products_versioned(query, category, sort, limit)
+        return results
+
+    async def search_products_versioned(
+        self,
+        query: str = "",
+        category: str = "",
+        sort: str = "",
+        limit: Optional[int] = None,
+    ) -> Tuple[list, int]:
+        """Like :meth:`search_products`, also returning the content version.
+
+        The version is behind ``data.content_version()`` when the previous
+        shards served the search while new ones were being built, or when
+        the catalog changed during the search.
+        """
+        cost = estimate_search_cost(query, category)
+        if self.mode == "sharded" and self.should_offload(cost):
+            sharded = await self._sharded.aget()
+            results = await sharded.asearch_products(query, category, sort, limit)
+            return results, sharded.version
+        version = data.content_version()
+        results = await self.run(
+            cost, data.search_products, query, category, sort, limit
+        )
+        return results, version
+
+    def shutdown(self) -> None:
+        """Shut down the worker pools, if any were started, and wait for them."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._threads is not None:
+            self._threads.shutdown()
+            self._threads = None
+        self._sharded.clear()
+
+
+class IndexCache(Generic[T]):
+    """Holds an index derived from the catalog and rebuilds it when stale.
+
+    ``build(products, version)`` creates an index whose ``version``
+    attribute records the content version (see ``data.content_version``)
+    it covers; stock-only updates never make it stale. :meth:`get` rebuilds
+    inline. :meth:`aget` is for the event loop: the rebuild runs in a
+    thread and, except for the very first build, callers keep getting the
+    previous index meanwhile, so no request waits for a rebuild.
+
+    ``retire``, if given, releases an index once it has been replaced; it
+    is called in a thread when the replacement was built by :meth:`aget`.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[List[dict], int], T],
+        retire: Optional[Callable[[T], None]] = None,
+    ):
+        self._build = build
+        self._retire = retire
+        self.index: Optional[T] = None
+        self._rebuild: Optional[asyncio.Future] = None
+
+    def _stale(self) -> bool:
+        return self.index is None or self.index.version != data.content_version()
+
+    def _snapshot(self):
+        # Read the version first: a change made while copying then leaves
+        # the new index marked stale instead of wrongly current
+        version = data.content_version()
+        return list(data.PRODUCTS), version
+
+    def get(self) -> T:
+        """Get the index for the current catalog, rebuilding it inline."""
+        if self._stale():
+            previous, self.index = self.index, self._build(*self._snapshot())
+            if previous is not None and self._retire is not None:
+                self._retire(previous)
+        return self.index
+
+    def clear(self) -> None:
+        """Drop (and retire) the current index; the next get rebuilds it."""
+        previous, self.index = self.index, None
+        if previous is not None and self._retire is not None:
+            self._retire(previous)
+
+    async def aget(self) -> T:
+        """Get the index without blocking the event loop."""
+        if not self._stale():
+            return self.index
+        loop = asyncio.get_running_loop()
+        rebuild = self._rebuild
+        if rebuild is None or rebuild.get_loop() is not loop:
+            rebuild = loop.run_in_executor(None, self._build, *self._snapshot())
+            rebuild.add_done_callback(self._finish)
+            self._rebuild = rebuild
+        if self.index is None:
+            return await asyncio.shield(rebuild)
+        return self.index
+
+    def _finish(self, rebuild: asyncio.Future) -> None:
+        if self._rebuild is rebuild:
+            self._rebuild = None
+        if rebuild.cancelled() or rebuild.exception() is not None:
+            return
+        index = rebuild.result()
+        if self.index is None or index.version >= self.index.version:
+            index, self.index = self.index, index
+        if index is not None and self._retire is not None:
+            rebuild.get_loop().run_in_executor(None, self._retire, index)
+
+
+def _close(resource: Any) -> None:
+    resource.close()
+
+
+_offloader: Optional[Offloader] = None
+
+
+def get_offloader() -> Offloader:
+    """Get the process-wide offloader, configured from the environment.
+
+    ``MCP_OFFLOAD_MODE`` selects ``inline``, ``thread`` (default),
+    ``process`` or ``sharded``; ``MCP_OFFLOAD_THRESHOLD`` sets the cost
+    threshold and ``MCP_SHARDS`` the shard count for sharded mode.
+    """
+    global _offloader
+    if _offloader is None:
+        _offloader = Offloader(
+            mode=os.environ.get("MCP_OFFLOAD_MODE", "thread"),
+            cost_threshold=int(
+                os.environ.get("MCP_OFFLOAD_THRESHOLD", DEFAULT_COST_THRESHOLD)
+            ),
+            num_shards=int(os.environ.get("MCP_SHARDS", 4)),
+        )
+    return _offloader
+
+
+def set_offloader(offloader: Offloader) -> Optional[Offloader]:
+    """Replace the process-wide offloader and return the previous one."""
+    global _offloader
+    previous, _offloader = _offloader, offloader
+    return previous
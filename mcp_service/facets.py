@@ -0,0 +1,201 @@
+"""Faceted aggregates over the catalog.
+
+Per-category counts, in-stock counts and price histograms are kept up to
+date from catalog change notifications instead of being recomputed for
+each request. A full rebuild only happens when the catalog was changed
+without going through the ``data`` mutation functions.
+"""
+
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Optional
+
+from mcp_service import data
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 50, 100, 250, 500, 1000, 2500)
+
+
+def _bucket(price: float) -> int:
+    return max(bisect_right(PRICE_BUCKETS, price) - 1, 0)
+
+
+class _Stats:
+    """Count, price histogram and price range for one group of products."""
+
+    __slots__ = ("count", "histogram", "prices", "_low", "_high", "_dirty")
+
+    def __init__(self):
+        self.count = 0
+        self.histogram = [0] * len(PRICE_BUCKETS)
+        self.prices: Counter = Counter()
+        self._low: Optional[float] = None
+        self._high: Optional[float] = None
+        self._dirty = False
+
+    def add(self, price: float, delta: int) -> None:
+        self.count += delta
+        self.histogram[_bucket(price)] += delta
+        self.prices[price] += delta
+        if self.prices[price] <= 0:
+            del self.prices[price]
+            # Only removing the current min or max invalidates the range
+            if price == self._low or price == self._high:
+                self._dirty = True
+        elif delta > 0 and not self._dirty:
+            self._low = price if self._low is None else min(self._low, price)
+            self._high = price if self._high is None else max(self._high, price)
+
+    def price_range(self):
+        if self._dirty:
+            self._low = min(self.prices, default=None)
+            self._high = max(self.prices, default=None)
+            self._dirty = False
+        return self._low, self._high
+
+    def merge(self, other: "_Stats") -> None:
+        """Fold another group into this one (counts and range only)."""
+        self.count += other.count
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        low, high = other.price_range()
+        if low is not None:
+            self._low = low if self._low is None else min(self._low, low)
+            self._high = high if self._high is None else max(self._high, high)
+
+    def as_dict(self) -> dict:
+        low, high = self.price_range()
+        return {
+            "count": self.count,
+            "price_min": low,
+            "price_max": high,
+            "price_histogram": [
+                {
+                    "min": edge,
+                    "max": PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+                    "count": self.histogram[i],
+                }
+                for i, edge in enumerate(PRICE_BUCKETS)
+            ],
+        }
+
+
+class FacetAggregates:
+    """Incrementally maintained per-category aggregates."""
+
+    def __init__(self):
+        self._all: Dict[str, _Stats] = {}
+        self._in_stock: Dict[str, _Stats] = {}
+        self.version = -1
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recompute every aggregate from the current catalog."""
+        self._all.clear()
+        self._in_stock.clear()
+        for product in data.PRODUCTS:
+            self._apply(product, 1)
+        self.version = data.catalog_version()
+
+    def _apply(self, product: dict, delta: int) -> None:
+        category = product["category"]
+        self._all.setdefault(category, _Stats()).add(product["price"], delta)
+        if product["stock"] > 0:
+            self._in_stock.setdefault(category, _Stats()).add(product["price"], delta)
+        for stats in (self._all, self._in_stock):
+            if category in stats and stats[category].count == 0:
+                del stats[category]
+
+    def on_catalog_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        """Catalog listener: move one product's contribution."""
+        if self.version != data.catalog_version() - 1:
+            # Missed an untracked change; incremental updates would drift
+            self.rebuild()
+            return
+        if old is not None:
+            self._apply(old, -1)
+        if new is not None:
+            self._apply(new, 1)
+        self.version = data.catalog_version()
+
+    def facets(self, category: str = "", in_stock_only: bool = False) -> dict:
+        """Return per-category facets, optionally for a single category."""
+        if self.version != data.catalog_version():
+            self.rebuild()
+        wanted = category.lower()
+        source = self._in_stock if in_stock_only else self._all
+        categories: List[dict] = []
+        total, total_in_stock = _Stats(), _Stats()
+        for name in sorted(source):
+            if wanted and name.lower() != wanted:
+                continue
+            stats = source[name]
+            in_stock = self._in_stock.get(name)
+            total.merge(stats)
+            if in_stock is not None:
+                total_in_stock.merge(in_stock)
+            categories.append(
+                {
+                    "category": name,
+                    "in_stock": in_stock.count if in_stock is not None else 0,
+                    **stats.as_dict(),
+                }
+            )
+        return {
+            "categories": categories,
+            "total": {"in_stock": total_in_stock.count, **total.as_dict()},
+            "catalog_version": self.version,
+        }
+
+
+def facets_for_products(products: List[dict]) -> dict:
+    """Compute facets over an explicit product list (e.g. search results)."""
+    stats: Dict[str, _Stats] = {}
+    in_stock: Dict[str, int] = {}
+    for product in products:
+        category = product["category"]
+        stats.setdefault(category, _Stats()).add(product["price"], 1)
+        in_stock[category] = in_stock.get(category, 0) + (product["stock"] > 0)
+    total = _Stats()
+    for group in stats.values():
+        total.merge(group)
+    return {
+        "categories": [
+            {"category": name, "in_stock": in_stock[name], **stats[name].as_dict()}
+            for name in sorted(stats)
+        ],
+        "total": {"in_stock": sum(in_stock.values()), **total.as_dict()},
+        "catalog_version": data.catalog_version(),
+    }
+
+
+_aggregates: Optional[FacetAggregates] = None
+
+
+def get_facet_aggregates() -> FacetAggregates:
+    """Get the process-wide aggregates, subscribing them to catalog changes."""
+    global _aggregates
+    if _aggregates is None:
+        _aggregates = FacetAggregates()
+        data.add_catalog_listener(_aggregates.on_catalog_change)
+    return _aggregates
+
+
+def get_facets(
+    category: str = "", in_stock_only: bool = False, query: str = ""
+) -> dict:
+    """Facets for the catalog, or for products matching a name query."""
+    if not query:
+        return get_facet_aggregates().facets(category, in_stock_only)
+
+    # A free-text filter cannot be served from precomputed counts
+    needle = query.lower()
+    wanted = category.lower()
+    return facets_for_products(
+        [
+            product
+            for product in data.PRODUCTS
+            if needle in product["name"].lower()
+            and (not wanted or wanted == product["category"].lower())
+            and (not in_stock_only or product["stock"] > 0)
+        ]
+    )
@@ -1,138 +1,536 @@
 """MCP message handlers and API endpoints for Product Search Service."""
 
-from typing import List
+import asyncio
+import json
+from functools import cached_property
+from typing import Annotated, Dict, List, Literal, Optional, Set, Tuple, Type, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, create_model
 
+from mcp_service.admission import (
+    AdmissionController,
+    classify_mcp,
+    client_key,
+    overloaded_error,
+)
+from mcp_service.analytics import HotQueries
+from mcp_service.coalescing import SingleFlight
 from mcp_service.data import (
+    catalog_version,
     check_inventory,
+    content_version,
     get_all_categories,
     get_product_details,
-    search_products,
+    parse_sort,
 )
+from mcp_service.executor import get_offloader
+from mcp_service.facets import get_facets
 from mcp_service.models import (
+    CapabilitiesRequest,
+    FacetsRequest,
+    InventoryCheckRequest,
     InventoryStatus,
+    MCPCall,
     MCPRequest,
     MCPResponse,
+    PingRequest,
     Product,
+    ProductDetailsRequest,
+    ProductSearchRequest,
     ProductSummary,
 )
+from mcp_service.search_index import afuzzy_search_versioned
+from mcp_service.text_index import atext_search_versioned
+from mcp_service.timing import NULL_TIMING, ServerTiming
 
 router = APIRouter()
 
+SEARCH_MODES = ("substring", "fuzzy", "text")
+
+# Requests a single WebSocket connection may have in flight at once
+WS_MAX_IN_FLIGHT = 32
+
+# Tool descriptions returned by the MCP ``capabilities`` method
+MCP_TOOLS = [
+    {
+        "name": "search_products",
+        "description": "Search for products by name or category",
+        "parameters": {
+            "query": {
+                "type": "string",
+                "description": "Search query for product name",
+            },
+            "category": {
+                "type": "string",
+                "description": "Product category filter",
+            },
+            "sort": {
+                "type": "string",
+                "description": (
+                    "Sort field: price or name, prefix with - for descending"
+                ),
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum results",
+            },
+            "mode": {
+                "type": "string",
+                "description": (
+                    "substring (default), fuzzy for "
+                    "typo-tolerant ranked results, or "
+                    "text for full-text queries over "
+                    'descriptions (AND, OR, "phrase")'
+                ),
+            },
+        },
+    },
+    {
+        "name": "get_product_details",
+        "description": "Get detailed information about a specific product",
+        "parameters": {
+            "product_id": {
+                "type": "string",
+                "description": "Product ID",
+                "required": True,
+            }
+        },
+    },
+    {
+        "name": "check_inventory",
+        "description": "Check stock levels for a product",
+        "parameters": {
+            "product_id": {
+                "type": "string",
+                "description": "Product ID",
+                "required": True,
+            }
+        },
+    },
+    {
+        "name": "facets",
+        "description": "Per-category counts, in-stock counts and price histograms",
+        "parameters": {
+            "category": {
+                "type": "string",
+                "description": "Product category filter",
+            },
+            "in_stock_only": {
+                "type": "boolean",
+                "description": "Only count items in stock",
+            },
+            "query": {
+                "type": "string",
+                "description": "Product name filter",
+            },
+        },
+    },
+]
+
+# Params model for each MCP method. Pydantic compiles each model's
+# validator once, when the class is defined.
+TOOL_PARAMS: Dict[str, Type[BaseModel]] = {
+    "ping": PingRequest,
+    "capabilities": CapabilitiesRequest,
+    "search_products": ProductSearchRequest,
+    "get_product_details": ProductDetailsRequest,
+    "check_inventory": InventoryCheckRequest,
+    "facets": FacetsRequest,
+}
+
+
+def _tool_call_model(method: str, params_model: Type[BaseModel]) -> Type[MCPCall]:
+    """Envelope model for one MCP method, with params typed for its tool."""
+    return create_model(
+        f"{params_model.__name__.removesuffix('Request')}Call",
+        __base__=MCPCall,
+        method=(Literal[method], ...),
+        params=(params_model, Field(default_factory=dict, validate_default=True)),
+    )
+
+
+# Envelope models discriminated on ``method``: one adapter, built once,
+# parses a message and validates its envelope and params together
+_MCP_CALL: TypeAdapter = TypeAdapter(
+    Annotated[
+        Union[tuple(_tool_call_model(*item) for item in TOOL_PARAMS.items())],
+        Field(discriminator="method"),
+    ]
+)
+
+# Read-only tools whose identical concurrent calls share one computation
+COALESCED_METHODS = frozenset(
+    {"search_products", "get_product_details", "check_inventory", "facets"}
+)
+
+# Serialized /mcp/capabilities document and the content version it lists
+# categories for
+_capabilities_json: Optional[Tuple[int, bytes]] = None
+
+# Result of the MCP ``capabilities`` method, serialized once since the tool
+# list never changes: '{"result":...,"error":null}' without the id
+_MCP_CAPABILITIES_PAYLOAD = MCPResponse(
+    id=0, result={"capabilities": {"tools": MCP_TOOLS}}
+).model_dump_json(exclude={"id"})
+
+
+def _check_search_params(sort: str, limit: Optional[int], mode: str) -> None:
+    """Validate search options, raising ValueError on bad input."""
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported search mode: {mode}")
+    if sort:
+        if mode == "fuzzy":
+            raise ValueError("sort is not supported with mode=fuzzy")
+        parse_sort(sort)
+    if limit is not None and (not isinstance(limit, int) or limit < 0):
+        raise ValueError("limit must be a non-negative integer")
+
+
+async def _run_search(
+    query: str, category: str, sort: str, limit: Optional[int], mode: str
+) -> Tuple[list, int]:
+    """Run a validated search in the requested mode.
+
+    Returns the results and the content version they reflect, which lags
+    the catalog while a rebuilt index or shard set is not yet ready.
+    """
+    if mode == "fuzzy":
+        return await afuzzy_search_versioned(query, category, limit)
+    if mode == "text":
+        return await atext_search_versioned(query, category, sort, limit)
+    return await get_offloader().search_products_versioned(query, category, sort, limit)
+
+
+def _with_id(request_id, payload: str) -> str:
+    """Splice a request id into a serialized response without its id."""
+    return f'{{"id":{json.dumps(request_id)},{payload[1:]}'
+
 
-@router.post("/mcp/message", response_model=MCPResponse)
-async def handle_mcp_message(request: MCPRequest) -> MCPResponse:
+class _SharedResponse:
+    """A coalesced response, serialized once for all callers that share it."""
+
+    def __init__(self, response: MCPResponse):
+        self.response = response
+
+    @cached_property
+    def payload(self) -> str:
+        # '{"result":...,"error":...}', without the per-caller id
+        return self.response.model_dump_json(exclude={"id"})
+
+
+async def _respond(
+    request: MCPCall,
+    single_flight: Optional[SingleFlight],
+    timing: ServerTiming = NULL_TIMING,
+) -> str:
+    """Dispatch and serialize a call parsed by :func:`parse_mcp_call`.
+
+    With a SingleFlight, identical concurrent calls to read-only tools share
+    one dispatch and one serialized payload; only the ``id`` is spliced in
+    per caller. Calls are identical when method, normalized params and
+    catalog version match, so key order and spelled-out defaults do not
+    matter.
+    """
+    if request.method == "capabilities":
+        with timing.measure("serialize"):
+            return _with_id(request.id, _MCP_CAPABILITIES_PAYLOAD)
+    params = request.params
+    params_json = (
+        params.model_dump_json() if request.method in COALESCED_METHODS else None
+    )
+    if request.method == "search_products":
+        # Counted once per incoming request, before any coalescing
+        pinned = _record_search(params, params_json)
+        if pinned is not None:
+            with timing.measure("serialize"):
+                return MCPResponse(id=request.id, result=pinned).model_dump_json()
+
+    if single_flight is None or params_json is None:
+        with timing.measure("dispatch"):
+            response = await dispatch_mcp_request(request, timing, params_json)
+        with timing.measure("serialize"):
+            return response.model_dump_json()
+
+    async def dispatch() -> _SharedResponse:
+        return _SharedResponse(await dispatch_mcp_request(request, timing, params_json))
+
+    key = (request.method, params_json, catalog_version())
+
+    with timing.measure("dispatch"):
+        shared = await single_flight.do(key, dispatch)
+    with timing.measure("serialize"):
+        return _with_id(request.id, shared.payload)
+
+
+async def _search_result(params: ProductSearchRequest) -> Tuple[dict, int]:
+    """Run a validated search and build its MCP result and content version."""
+    results, version = await _run_search(
+        params.query or "",
+        params.category or "",
+        params.sort or "",
+        params.limit,
+        params.mode,
+    )
+    return {"products": results, "count": len(results)}, version
+
+
+async def _pinned_search(key: str) -> Tuple[dict, int]:
+    """Compute a hot query from its key, the normalized params JSON."""
+    return await _search_result(ProductSearchRequest.model_validate_json(key))
+
+
+# Search statistics and precomputed results for the hottest queries
+hot_queries = HotQueries.from_env(_pinned_search)
+
+
+def _record_search(params: ProductSearchRequest, params_json: str) -> Optional[dict]:
+    """Count a search for analytics; return its pinned result if current."""
+    return hot_queries.record(params_json, params.category or "")
+
+
+@router.post(
+    "/mcp/message",
+    response_model=MCPResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": MCPRequest.model_json_schema()}},
+        }
+    },
+)
+async def handle_mcp_message(http_request: Request) -> Response:
     """Handle incoming MCP messages for product operations."""
+    server_timing = getattr(http_request.app.state, "server_timing", False)
+    timing = ServerTiming() if server_timing else NULL_TIMING
+
+    # The body is parsed here rather than by FastAPI, so that the envelope
+    # and the tool's params are validated in one pass
+    request = parse_mcp_call(await http_request.body())
+    if isinstance(request, MCPResponse):
+        body = request.model_dump_json()
+    else:
+        single_flight = getattr(http_request.app.state, "single_flight", None)
+        body = await _respond(request, single_flight, timing)
+
+    headers = {"Server-Timing": timing.header()} if server_timing else None
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.websocket("/mcp/ws")
+async def mcp_websocket(websocket: WebSocket):
+    """Handle MCP messages over a WebSocket.
+
+    Each text frame carries one MCPRequest. Requests run concurrently (up to
+    WS_MAX_IN_FLIGHT per connection) and responses are sent as they complete,
+    so clients match them to requests by ``id``. Every frame passes admission
+    control like an HTTP request; rejected frames get a ``-32000`` error.
+    """
+    admission: Optional[AdmissionController] = getattr(
+        websocket.app.state, "admission", None
+    )
+    client = client_key(websocket.scope)
+    await websocket.accept()
+    in_flight = asyncio.Semaphore(WS_MAX_IN_FLIGHT)
+    send_lock = asyncio.Lock()
+    pending: Set[asyncio.Task] = set()
+
+    async def send(text: str) -> None:
+        async with send_lock:
+            await websocket.send_text(text)
+
+    async def run(request: MCPCall) -> None:
+        try:
+            if admission is not None:
+                lane = classify_mcp(request.method, dict(request.params))
+                rejection = await admission.admit(client, lane)
+                if rejection is not None:
+                    await send(json.dumps(overloaded_error(request.id, rejection[0])))
+                    return
+            try:
+                single_flight = getattr(websocket.app.state, "single_flight", None)
+                await send(await _respond(request, single_flight))
+            finally:
+                if admission is not None:
+                    admission.release()
+        finally:
+            in_flight.release()
+
+    try:
+        while True:
+            request = parse_mcp_call(await websocket.receive_text())
+            if isinstance(request, MCPResponse):
+                await send(request.model_dump_json())
+                continue
+
+            # Stop reading new frames while the connection is at its limit
+            await in_flight.acquire()
+            task = asyncio.create_task(run(request))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _params_error(error: ValidationError) -> str:
+    """Summarize a params ValidationError for a -32602 response."""
+    missing = [
+        ".".join(map(str, e["loc"])) for e in error.errors() if e["type"] == "missing"
+    ]
+    if missing:
+        return f"Missing required parameter: {', '.join(missing)}"
+    details = "; ".join(
+        f"{'.'.join(map(str, e['loc'])) or 'params'}: {e['msg']}"
+        for e in error.errors()
+    )
+    return f"Invalid params: {details}"
+
+
+def parse_mcp_call(message: Union[str, bytes]) -> Union[MCPCall, MCPResponse]:
+    """Parse an MCP message, validating its envelope and params in one pass.
+
+    Returns the call, or the error response: ``-32700`` for invalid JSON,
+    ``-32600`` for an invalid envelope, ``-32601`` for an unknown method and
+    ``-32602`` for malformed params.
+    """
+    try:
+        call = _MCP_CALL.validate_json(message)
+    except ValidationError as e:
+        return _call_error(message, e)
+    if call.method == "search_products":
+        params = call.params
+        try:
+            _check_search_params(params.sort, params.limit, params.mode)
+        except ValueError as e:
+            return MCPResponse(
+                id=call.id,
+                error={"code": -32602, "message": f"Invalid params: {e}"},
+            )
+    return call
+
+
+def _call_error(message: Union[str, bytes], error: ValidationError) -> MCPResponse:
+    """Build the error response for a message that failed to parse."""
+    if error.errors()[0]["type"] == "json_invalid":
+        return MCPResponse(id=None, error={"code": -32700, "message": "Parse error"})
+    # Only a failed message is parsed again, to tell which part was wrong
+    try:
+        request = MCPRequest.model_validate_json(message)
+    except ValidationError:
+        request = None
+    if request is not None:
+        response = _validate_params(request)
+        if isinstance(response, MCPResponse):
+            return response
+    return MCPResponse(id=None, error={"code": -32600, "message": "Invalid Request"})
+
+
+def _validate_params(request: MCPRequest) -> Union[BaseModel, MCPResponse]:
+    """Validate params against the tool's model in one pass.
+
+    Returns the parsed params, or the error response for an unknown method
+    (``-32601``) or malformed params (``-32602``).
+    """
+    params_model = TOOL_PARAMS.get(request.method)
+    if params_model is None:
+        return MCPResponse(
+            id=request.id,
+            error={
+                "code": -32601,
+                "message": f"Method not found: {request.method}",
+            },
+        )
+    try:
+        params = params_model.model_validate(request.params)
+        if request.method == "search_products":
+            _check_search_params(params.sort, params.limit, params.mode)
+    except ValidationError as e:
+        return MCPResponse(
+            id=request.id, error={"code": -32602, "message": _params_error(e)}
+        )
+    except ValueError as e:
+        return MCPResponse(
+            id=request.id,
+            error={"code": -32602, "message": f"Invalid params: {e}"},
+        )
+    return params
+
+
+async def dispatch_mcp_request(
+    request: Union[MCPRequest, MCPCall],
+    timing: ServerTiming = NULL_TIMING,
+    params_json: Optional[str] = None,
+    track: bool = False,
+) -> MCPResponse:
+    """Route an MCP request to its tool and build the response.
+
+    Params are validated before any data access. A call from
+    :func:`parse_mcp_call` already carries them parsed (and callers may pass
+    their normalized JSON ``params_json`` for read-only tools), so they are
+    not parsed again.
+
+    With ``track``, searches are counted in the hot-query analytics and
+    may be answered from a pinned result. ``_respond`` counts requests
+    itself, before coalescing, and internal traffic such as the warm-up
+    is not counted.
+    """
+    if isinstance(request, MCPCall):
+        params = request.params
+    else:
+        params = _validate_params(request)
+        if isinstance(params, MCPResponse):
+            return params
+
     try:
         # Handle different MCP methods
         if request.method == "ping":
             return MCPResponse(
                 id=request.id,
-                result={
-                    "message": "pong",
-                    "timestamp": request.params.get("timestamp"),
-                },
+                result={"message": "pong", "timestamp": params.timestamp},
             )
 
         elif request.method == "capabilities":
             return MCPResponse(
                 id=request.id,
-                result={
-                    "capabilities": {
-                        "tools": [
-                            {
-                                "name": "search_products",
-                                "description": (
-                                    "Search for products by name or category"
-                                ),
-                                "parameters": {
-                                    "query": {
-                                        "type": "string",
-                                        "description": (
-                                            "Search query for product name"
-                                        ),
-                                    },
-                                    "category": {
-                                        "type": "string",
-                                        "description": ("Product category filter"),
-                                    },
-                                },
-                            },
-                            {
-                                "name": "get_product_details",
-                                "description": (
-                                    "Get detailed information about a "
-                                    "specific product"
-                                ),
-                                "parameters": {
-                                    "product_id": {
-                                        "type": "string",
-                                        "description": "Product ID",
-                                        "required": True,
-                                    }
-                                },
-                            },
-                            {
-                                "name": "check_inventory",
-                                "description": ("Check stock levels for a product"),
-                                "parameters": {
-                                    "product_id": {
-                                        "type": "string",
-                                        "description": "Product ID",
-                                        "required": True,
-                                    }
-                                },
-                            },
-                        ]
-                    }
-                },
+                result={"capabilities": {"tools": MCP_TOOLS}},
             )
 
         elif request.method == "search_products":
-            query = request.params.get("query", "")
-            category = request.params.get("category", "")
-            results = search_products(query, category)
-            return MCPResponse(
-                id=request.id, result={"products": results, "count": len(results)}
-            )
+            if track:
+                pinned = _record_search(params, params_json or params.model_dump_json())
+                if pinned is not None:
+                    return MCPResponse(id=request.id, result=pinned)
+            with timing.measure("data"):
+                result, _ = await _search_result(params)
+            return MCPResponse(id=request.id, result=result)
 
         elif request.method == "get_product_details":
-            product_id = request.params.get("product_id")
-            if not product_id:
-                return MCPResponse(
-                    id=request.id,
-                    error={
-                        "code": -32602,
-                        "message": "Missing required parameter: product_id",
-                    },
-                )
-
-            product = get_product_details(product_id)
+            with timing.measure("data"):
+                product = get_product_details(params.product_id)
             return MCPResponse(id=request.id, result=product)
 
         elif request.method == "check_inventory":
-            product_id = request.params.get("product_id")
-            if not product_id:
-                return MCPResponse(
-                    id=request.id,
-                    error={
-                        "code": -32602,
-                        "message": "Missing required parameter: product_id",
-                    },
-                )
-
-            inventory = check_inventory(product_id)
+            with timing.measure("data"):
+                inventory = check_inventory(params.product_id)
             return MCPResponse(id=request.id, result=inventory)
 
-        else:
-            return MCPResponse(
-                id=request.id,
-                error={
-                    "code": -32601,
-                    "message": f"Method not found: {request.method}",
-                },
-            )
+        else:  # facets
+            with timing.measure("data"):
+                facets = get_facets(
+                    params.category or "", params.in_stock_only, params.query or ""
+                )
+            return MCPResponse(id=request.id, result=facets)
 
     except Exception as e:
         return MCPResponse(
@@ -142,13 +540,39 @@ async def handle_mcp_message(request: MCPRequest) -> MCPResponse:
 
 
 # REST API endpoints for direct access
-@router.get("/products/search", response_model=List[ProductSummary])
-async def search_products_api(query: str = "", category: str = ""):
+@router.get(
+    "/products/search",
+    response_model=List[ProductSummary],
+    response_model_exclude_none=True,
+)
+async def search_products_api(
+    response: Response,
+    query: str = "",
+    category: str = "",
+    sort: str = "",
+    limit: Optional[int] = Query(None, ge=0),
+    mode: str = "substring",
+):
     """REST API endpoint for product search."""
-    results = search_products(query, category)
+    try:
+        _check_search_params(sort, limit, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    results, version = await _run_search(query, category, sort, limit, mode)
+    if version != content_version():
+        # Served from an index that is being rebuilt; don't let caches keep it
+        response.headers["Cache-Control"] = "no-store"
     return [ProductSummary(**product) for product in results]
 
 
+@router.get("/products/facets")
+async def get_facets_api(
+    category: str = "", in_stock_only: bool = False, query: str = ""
+):
+    """REST API endpoint for catalog facets."""
+    return get_facets(category, in_stock_only, query)
+
+
 @router.get("/products/{product_id}", response_model=Product)
 async def get_product_api(product_id: str):
     """REST API endpoint for product details."""
@@ -173,29 +597,27 @@ async def get_categories_api():
     return {"categories": get_all_categories()}
 
 
+def capabilities_json() -> bytes:
+    """Serialized /mcp/capabilities document, rebuilt when the catalog changes."""
+    global _capabilities_json
+    version = content_version()
+    if _capabilities_json is None or _capabilities_json[0] != version:
+        document = {
+            "service": "Product Search MCP Service",
+            "version": "0.1.0",
+            "capabilities": {
+                "tools": [
+                    {"name": tool["name"], "description": tool["description"]}
+                    for tool in MCP_TOOLS
+                ]
+            },
+            "available_categories": get_all_categories(),
+        }
+        _capabilities_json = (version, json.dumps(document).encode())
+    return _capabilities_json[1]
+
+
 @router.get("/mcp/capabilities")
 async def get_capabilities():
     """Get MCP service capabilities."""
-    return {
-        "service": "Product Search MCP Service",
-        "version": "0.1.0",
-        "capabilities": {
-            "tools": [
-                {
-                    "name": "search_products",
-                    "description": "Search for products by name or category",
-                },
-                {
-                    "name": "get_product_details",
-                    "description": (
-                        "Get detailed information about a specific product"
-                    ),
-                },
-                {
-                    "name": "check_inventory",
-                    "description": "Check stock levels for a product",
-                },
-            ]
-        },
-        "available_categories": get_all_categories(),
-    }
+    return Response(capabilities_json(), media_type="application/json")
@@ -7,18 +7,55 @@ inventory management.
 Author: Chandra Shettigar <chandra@devteds.com>
 """
 
-import uvicorn
+import argparse
+import os
 
+TRANSPORTS = ("http", "stdio", "streamable-http")
 
-def main():
+
+def main(argv=None):
     """Main entry point for the MCP service."""
+    parser = argparse.ArgumentParser(description="Product Search MCP service")
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default="http",
+        help=(
+            "http: FastAPI app with JSON-over-POST and REST routes (default); "
+            "stdio / streamable-http: native MCP SDK server"
+        ),
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--fast-start",
+        action="store_true",
+        help=(
+            "Startup-optimized http mode: no auto-reload or docs UIs, and "
+            "catalog indexes are built before the server accepts connections"
+        ),
+    )
+    args = parser.parse_args(argv)
+
+    if args.transport != "http":
+        from mcp_service.mcp_server import create_mcp_server
+
+        create_mcp_server(host=args.host, port=args.port).run(args.transport)
+        return
+
+    import uvicorn
+
+    if args.fast_start:
+        # Read by create_app(), which uvicorn calls as a factory
+        os.environ["MCP_FAST_START"] = "1"
+
     # Use import string for reload to work properly
     uvicorn.run(
         "mcp_service.server:create_app",
         factory=True,
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=args.host,
+        port=args.port,
+        reload=not args.fast_start,
         log_level="info",
     )
 
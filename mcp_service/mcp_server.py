@@ -0,0 +1,77 @@
+"""Native MCP server built on the MCP Python SDK.
+
+Exposes the product tools over the SDK's stdio and streamable-HTTP
+transports, so agents can keep one long-lived session open instead of
+paying for a separate HTTP request per tool call. Every tool goes through
+the same dispatcher as ``/api/v1/mcp/message``.
+"""
+
+from typing import Optional
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_service.handlers import dispatch_mcp_request
+from mcp_service.models import MCPRequest
+
+SERVER_NAME = "product-search"
+
+
+async def _call(method: str, **params) -> dict:
+    """Run a tool through the shared dispatcher, raising on MCP errors."""
+    params = {key: value for key, value in params.items() if value is not None}
+    response = await dispatch_mcp_request(
+        MCPRequest(id=method, method=method, params=params), track=True
+    )
+    if response.error is not None:
+        raise ValueError(response.error["message"])
+    return response.result
+
+
+def create_mcp_server(host: str = "127.0.0.1", port: int = 8000) -> FastMCP:
+    """Create the SDK server with the product tools registered."""
+    # The SDK logs every request at INFO, which adds per-call overhead
+    server = FastMCP(SERVER_NAME, host=host, port=port, log_level="WARNING")
+
+    @server.tool()
+    async def search_products(
+        query: str = "",
+        category: str = "",
+        sort: str = "",
+        limit: Optional[int] = None,
+        mode: str = "substring",
+    ) -> dict:
+        """Search for products by name or category.
+
+        mode is substring (default), fuzzy for typo-tolerant ranked results,
+        or text for full-text queries (AND, OR, "phrase"). sort is price or
+        name, prefixed with - for descending.
+        """
+        return await _call(
+            "search_products",
+            query=query,
+            category=category,
+            sort=sort,
+            limit=limit,
+            mode=mode,
+        )
+
+    @server.tool()
+    async def get_product_details(product_id: str) -> dict:
+        """Get detailed information about a specific product."""
+        return await _call("get_product_details", product_id=product_id)
+
+    @server.tool()
+    async def check_inventory(product_id: str) -> dict:
+        """Check stock levels for a product."""
+        return await _call("check_inventory", product_id=product_id)
+
+    @server.tool()
+    async def facets(
+        category: str = "", in_stock_only: bool = False, query: str = ""
+    ) -> dict:
+        """Per-category counts, in-stock counts and price histograms."""
+        return await _call(
+            "facets", category=category, in_stock_only=in_stock_only, query=query
+        )
+
+    return server
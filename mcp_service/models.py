@@ -1,8 +1,8 @@
 """Pydantic models for MCP service."""
 
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Literal, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class MCPRequest(BaseModel):
@@ -13,6 +13,19 @@ class MCPRequest(BaseModel):
     params: Dict[str, Any] = {}
 
 
+class MCPCall(BaseModel):
+    """MCP request with its params parsed into the tool's params model.
+
+    Each method has a subclass whose ``method`` is a literal (see
+    ``handlers.parse_mcp_call``), so a message is parsed and its envelope
+    and params validated in a single pass.
+    """
+
+    id: Union[str, int]
+    method: str
+    params: BaseModel
+
+
 class MCPError(BaseModel):
     """MCP error model."""
 
@@ -22,31 +35,52 @@ class MCPError(BaseModel):
 
 
 class MCPResponse(BaseModel):
-    """MCP response model."""
+    """MCP response model; ``id`` is null when the request's is unknown."""
 
-    id: Union[str, int]
+    id: Optional[Union[str, int]]
     result: Optional[Dict[str, Any]] = None
     error: Optional[Dict[str, Any]] = None
 
 
-# Product-specific models
+# Per-tool MCP params models
+class PingRequest(BaseModel):
+    """Ping request model."""
+
+    timestamp: Optional[Any] = None
+
+
+class CapabilitiesRequest(BaseModel):
+    """Capabilities request model."""
+
+
 class ProductSearchRequest(BaseModel):
     """Product search request model."""
 
     query: Optional[str] = ""
     category: Optional[str] = ""
+    sort: Optional[str] = ""
+    limit: Optional[int] = Field(default=None, ge=0)
+    mode: Literal["substring", "fuzzy", "text"] = "substring"
 
 
 class ProductDetailsRequest(BaseModel):
     """Product details request model."""
 
-    product_id: str
+    product_id: str = Field(min_length=1)
 
 
 class InventoryCheckRequest(BaseModel):
     """Inventory check request model."""
 
-    product_id: str
+    product_id: str = Field(min_length=1)
+
+
+class FacetsRequest(BaseModel):
+    """Facets request model."""
+
+    category: Optional[str] = ""
+    in_stock_only: bool = False
+    query: Optional[str] = ""
 
 
 # Product-specific models for REST API responses
@@ -68,6 +102,7 @@ class ProductSummary(BaseModel):
     name: str
     category: str
     price: float
+    score: Optional[float] = None
 
 
 class InventoryStatus(BaseModel):
@@ -0,0 +1,480 @@
+"""Crash-safe persistence of catalog and stock changes.
+
+Every catalog mutation (``upsert_product``, ``update_stock``,
+``remove_product``) is appended to a write-ahead log through a catalog
+listener. A background thread writes and fsyncs pending records in
+batches (group commit), so one fsync covers every record that arrived
+while the previous one was in progress.
+
+By default a mutation returns only once its record is durable, blocking
+the mutating thread for an fsync; use that only off the event loop. With
+``synchronous=False`` mutations return as soon as the record is queued,
+and callers wait with :meth:`WriteAheadLog.commit` (event loop) or
+:meth:`WriteAheadLog.sync` (threads); concurrent waiters share fsyncs.
+Once the flusher has failed, further mutations are refused before they
+change the catalog.
+
+A lock file keeps a second process from logging to the same directory.
+
+Periodically the catalog is written to a snapshot and the log is rotated,
+keeping recovery time bounded: startup loads the newest snapshot and
+replays only the log records written after it. If no readable snapshot
+precedes the log, startup fails instead of replaying onto a partial
+catalog.
+
+On-disk layout in the data directory::
+
+    snapshot-<lsn>.json   catalog as of log sequence number <lsn>
+    wal-<lsn>.log         records starting at <lsn>
+
+Each record is ``length, crc32, lsn`` (little-endian ``u32, u32, u64``)
+followed by a JSON payload: ``["u", product]``, ``["s", id, stock]`` or
+``["r", id]``. A torn or corrupt tail left by a crash is detected by its
+length or checksum and truncated during recovery.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Deque, List, Optional, Tuple, Union
+
+from mcp_service import data
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+HEADER = struct.Struct("<IIQ")
+
+# Pending work for the flusher: encoded records, or a checkpoint marker
+# carrying the catalog copy taken at that point in the log
+_Checkpoint = Tuple[int, List[dict]]
+
+
+def encode_record(lsn: int, op: list) -> bytes:
+    """Frame one log record."""
+    payload = json.dumps(op, separators=(",", ":")).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload), lsn) + payload
+
+
+def _op_for_change(old: Optional[dict], new: Optional[dict]) -> list:
+    """Smallest log operation that reproduces a catalog change."""
+    if new is None:
+        return ["r", old["id"]]
+    if data.is_stock_change(old, new):
+        return ["s", new["id"], new["stock"]]
+    return ["u", new]
+
+
+def _parse_name(name: str, prefix: str, suffix: str) -> Optional[int]:
+    if name.startswith(prefix) and name.endswith(suffix):
+        try:
+            return int(name[len(prefix) : -len(suffix)])
+        except ValueError:
+            return None
+    return None
+
+
+def _resolve(future: asyncio.Future, error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(RuntimeError("write-ahead log failed"))
+
+
+def _fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only log of catalog changes with group commit and snapshots."""
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_every: int = 100_000,
+        commit_delay: float = 0.0,
+        synchronous: bool = True,
+    ):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        # Whether each mutation blocks its thread until the record is durable
+        self.synchronous = synchronous
+        # Optional pause before each commit to gather larger batches
+        self.commit_delay = commit_delay
+        self.next_lsn = 1
+        self.durable_lsn = 0
+        self.appended = 0
+        self.commits = 0
+        self.checkpoints = 0
+        self._since_snapshot = 0
+        self._file = None
+        self._pending: Deque[Union[bytes, _Checkpoint]] = deque()
+        self._pending_lsn = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        # Event-loop callers of commit(), as (lsn, future)
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+        self._lock_file = None
+
+    # Recovery
+
+    def open(self) -> dict:
+        """Recover the catalog from disk, then start logging changes.
+
+        Returns recovery statistics. Raises if the log cannot be recovered
+        from any snapshot, rather than start from an incomplete catalog.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock()
+        try:
+            return self._open()
+        except BaseException:
+            self._unlock()
+            raise
+
+    def _open(self) -> dict:
+        if not self._snapshots():
+            if self._segments():
+                raise RuntimeError(
+                    f"data directory {self.directory} has log segments but "
+                    "no snapshot to replay them onto"
+                )
+            # First start: the current (bundled) catalog is the baseline
+            self._write_snapshot(0, [dict(product) for product in data.PRODUCTS])
+        start = time.perf_counter()
+        snapshot_lsn, products = self._load_snapshot()
+        catalog = {product["id"]: product for product in products}
+        replayed, truncated = self._replay(snapshot_lsn, catalog)
+        data.load_products(list(catalog.values()))
+
+        self.durable_lsn = self._pending_lsn = self.next_lsn - 1
+        segments = self._segments()
+        if segments:
+            self._file = open(self._segment_path(segments[-1]), "ab")
+        else:
+            self._file = open(self._segment_path(self.next_lsn), "ab")
+            _fsync_directory(self.directory)
+        self._since_snapshot = replayed
+
+        self._thread = threading.Thread(
+            target=self._flush_loop, name="mcp-wal", daemon=True
+        )
+        self._thread.start()
+        data.add_catalog_guard(self._check)
+        data.add_catalog_listener(self._on_change)
+        return {
+            "snapshot_lsn": snapshot_lsn,
+            "products": len(catalog),
+            "replayed": replayed,
+            "truncated_bytes": truncated,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def _lock(self) -> None:
+        """Take an exclusive lock on the directory for this log's lifetime."""
+        self._lock_file = open(os.path.join(self.directory, "LOCK"), "a+")
+        if fcntl is None:  # pragma: no cover
+            return
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise RuntimeError(
+                f"data directory {self.directory} is in use by another process"
+            ) from None
+
+    def _unlock(self) -> None:
+        if self._lock_file is not None:
+            # Closing the file releases the lock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _segments(self) -> List[int]:
+        starts = (
+            _parse_name(name, "wal-", ".log") for name in os.listdir(self.directory)
+        )
+        return sorted(lsn for lsn in starts if lsn is not None)
+
+    def _snapshots(self) -> List[int]:
+        lsns = (
+            _parse_name(name, "snapshot-", ".json")
+            for name in os.listdir(self.directory)
+        )
+        return sorted(lsn for lsn in lsns if lsn is not None)
+
+    def _segment_path(self, lsn: int) -> str:
+        return os.path.join(self.directory, f"wal-{lsn:020d}.log")
+
+    def _snapshot_path(self, lsn: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{lsn:020d}.json")
+
+    def _load_snapshot(self) -> Tuple[int, List[dict]]:
+        """Load the newest readable snapshot that the log continues from."""
+        snapshots = self._snapshots()
+        segments = self._segments()
+        for lsn in reversed(snapshots):
+            # An older snapshot is only usable while the log written after
+            # it is still on disk; rotation deletes that log
+            if segments:
+                covered = segments[0] <= lsn + 1
+            else:
+                covered = lsn == snapshots[-1]
+            if not covered:
+                break
+            try:
+                with open(self._snapshot_path(lsn), "rb") as f:
+                    snapshot = json.load(f)
+                return snapshot["lsn"], snapshot["products"]
+            except (OSError, ValueError, KeyError):
+                continue  # fall back to an older snapshot
+        raise RuntimeError(
+            f"data directory {self.directory} has no readable snapshot "
+            "that its log continues from"
+        )
+
+    def _replay(self, snapshot_lsn: int, catalog: dict) -> Tuple[int, int]:
+        """Apply log records after the snapshot; returns (applied, truncated)."""
+        replayed = truncated = 0
+        last_lsn = snapshot_lsn
+        segments = self._segments()
+        for position, segment in enumerate(segments):
+            path = self._segment_path(segment)
+            with open(path, "rb") as f:
+                buffer = f.read()
+            offset = 0
+            while offset + HEADER.size <= len(buffer):
+                length, crc, lsn = HEADER.unpack_from(buffer, offset)
+                end = offset + HEADER.size + length
+                payload = buffer[offset + HEADER.size : end]
+                if end > len(buffer) or zlib.crc32(payload) != crc:
+                    break
+                offset = end
+                if lsn <= last_lsn:
+                    continue
+                self._apply(catalog, json.loads(payload))
+                last_lsn = lsn
+                replayed += 1
+
+            if offset < len(buffer):
+                # Torn write from a crash: drop it and anything after it
+                truncated += len(buffer) - offset
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+                    os.fsync(f.fileno())
+                for later in segments[position + 1 :]:
+                    later_path = self._segment_path(later)
+                    truncated += os.path.getsize(later_path)
+                    os.remove(later_path)
+                break
+        self.next_lsn = last_lsn + 1
+        return replayed, truncated
+
+    @staticmethod
+    def _apply(catalog: dict, op: list) -> None:
+        kind = op[0]
+        if kind == "u":
+            product = op[1]
+            existing = catalog.get(product["id"])
+            if existing is None:
+                catalog[product["id"]] = product
+            else:
+                # Keep the product's position, like data.upsert_product
+                existing.clear()
+                existing.update(product)
+        elif kind == "s":
+            if op[1] in catalog:
+                catalog[op[1]]["stock"] = op[2]
+        elif kind == "r":
+            catalog.pop(op[1], None)
+
+    # Logging
+
+    def _check(self) -> None:
+        """Catalog guard: refuse changes the log can no longer record."""
+        if self._error is not None:
+            raise RuntimeError("write-ahead log failed") from self._error
+
+    def _on_change(self, old: Optional[dict], new: Optional[dict]) -> None:
+        lsn = self.append(_op_for_change(old, new))
+        self._since_snapshot += 1
+        if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+            self.checkpoint()
+        if self.synchronous:
+            self.wait_durable(lsn)
+
+    def append(self, op: list) -> int:
+        """Queue a record for the next group commit and return its LSN."""
+        self._check()
+        with self._cond:
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            self._pending.append(encode_record(lsn, op))
+            self._pending_lsn = lsn
+            self.appended += 1
+            self._cond.notify_all()
+        return lsn
+
+    def wait_durable(self, lsn: int, timeout: Optional[float] = None) -> bool:
+        """Block until the record with ``lsn`` has been fsynced.
+
+        Returns False on timeout; raises if the flusher has failed.
+        """
+        with self._cond:
+            durable = self._cond.wait_for(
+                lambda: self.durable_lsn >= lsn or self._error is not None, timeout
+            )
+        if self._error is not None:
+            raise RuntimeError("write-ahead log failed") from self._error
+        return durable
+
+    def sync(self) -> None:
+        """Block until everything appended so far is durable."""
+        self.wait_durable(self._pending_lsn)
+
+    async def commit(self) -> None:
+        """Wait until everything appended so far is durable.
+
+        Unlike :meth:`sync` this does not block the event loop, so
+        concurrent coroutines that each changed the catalog share fsyncs.
+        """
+        with self._cond:
+            self._check()
+            if self.durable_lsn >= self._pending_lsn:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((self._pending_lsn, future))
+        await future
+
+    def checkpoint(self) -> None:
+        """Snapshot the catalog and start a new log segment.
+
+        The catalog is copied here, on the mutating thread, so the snapshot
+        is consistent; serializing and writing it happen on the flusher.
+        """
+        products = [dict(product) for product in data.PRODUCTS]
+        with self._cond:
+            self._pending.append((self.next_lsn - 1, products))
+            self._since_snapshot = 0
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Flush outstanding records, stop the flusher and stop logging."""
+        data.remove_catalog_listener(self._on_change)
+        data.remove_catalog_guard(self._check)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._unlock()
+
+    def stats(self) -> dict:
+        return {
+            "appended": self.appended,
+            "commits": self.commits,
+            "checkpoints": self.checkpoints,
+            "durable_lsn": self.durable_lsn,
+            "next_lsn": self.next_lsn,
+        }
+
+    def _write_snapshot(self, lsn: int, products: List[dict]) -> None:
+        """Atomically write a snapshot: temp file, fsync, rename."""
+        path = self._snapshot_path(lsn)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"lsn": lsn, "products": products}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_directory(self.directory)
+
+    # Flusher thread
+
+    def _flush_loop(self) -> None:
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._pending or self._stopping)
+                    if not self._pending and self._stopping:
+                        return
+                if self.commit_delay:
+                    time.sleep(self.commit_delay)
+                with self._cond:
+                    batch = list(self._pending)
+                    self._pending.clear()
+                    last_lsn = self._pending_lsn
+                self._commit(batch)
+                with self._cond:
+                    self.durable_lsn = last_lsn
+                    self._cond.notify_all()
+                    ready = [w for w in self._waiters if w[0] <= last_lsn]
+                    self._waiters = [w for w in self._waiters if w[0] > last_lsn]
+                self._wake(ready, None)
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+                ready, self._waiters = self._waiters, []
+            self._wake(ready, e)
+
+    @staticmethod
+    def _wake(
+        waiters: List[Tuple[int, asyncio.Future]], error: Optional[BaseException]
+    ) -> None:
+        for _, future in waiters:
+            try:
+                future.get_loop().call_soon_threadsafe(_resolve, future, error)
+            except RuntimeError:
+                pass  # the waiter's event loop has closed
+
+    def _commit(self, batch: List[Union[bytes, _Checkpoint]]) -> None:
+        records: List[bytes] = []
+        for item in batch:
+            if isinstance(item, bytes):
+                records.append(item)
+                continue
+            self._write(records)
+            records = []
+            self._rotate(*item)
+        self._write(records)
+
+    def _write(self, records: List[bytes]) -> None:
+        if not records:
+            return
+        self._file.write(b"".join(records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.commits += 1
+
+    def _rotate(self, lsn: int, products: List[dict]) -> None:
+        """Write a snapshot as of ``lsn`` and drop the log it covers."""
+        self._write_snapshot(lsn, products)
+        self._file.close()
+        self._file = open(self._segment_path(lsn + 1), "ab")
+        _fsync_directory(self.directory)
+
+        for segment in self._segments():
+            if segment <= lsn:
+                os.remove(self._segment_path(segment))
+        for snapshot in self._snapshots():
+            if snapshot < lsn:
+                os.remove(self._snapshot_path(snapshot))
+        self.checkpoints += 1
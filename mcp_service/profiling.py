@@ -0,0 +1,219 @@
+"""On-demand profiling hooks for live workers.
+
+Provides a sampling profiler that emits flamegraph-compatible collapsed
+stacks and tracemalloc snapshot/diff helpers, served by the admin routes.
+"""
+
+import asyncio
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+
+def _frame_label(frame) -> str:
+    """Return a flamegraph frame label such as ``mcp_service.data:search``."""
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+class SamplingProfiler:
+    """Periodically sample the stacks of all threads in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """Whether a profiling session is in progress."""
+        return self._lock.locked()
+
+    def _sample(self, interval: float, samples: Counter) -> None:
+        own_ident = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                samples[";".join(reversed(stack))] += 1
+
+    async def profile(self, seconds: float, interval: float = 0.005) -> str:
+        """Sample for ``seconds`` and return collapsed stacks, one per line."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profiling session is already running")
+        try:
+            samples: Counter = Counter()
+            self._stop.clear()
+            sampler = threading.Thread(
+                target=self._sample,
+                args=(interval, samples),
+                name="mcp-sampling-profiler",
+                daemon=True,
+            )
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                self._stop.set()
+                await asyncio.to_thread(sampler.join)
+            return "".join(
+                f"{stack} {count}\n" for stack, count in sorted(samples.items())
+            )
+        finally:
+            self._lock.release()
+
+
+class MemoryTracer:
+    """Keep a bounded set of tracemalloc snapshots for diffing."""
+
+    def __init__(self, max_snapshots: int = 8):
+        self.max_snapshots = max_snapshots
+        self._snapshots: Dict[int, tracemalloc.Snapshot] = {}
+        self._next_id = 1
+
+    def start(self, frames: int = 1) -> None:
+        """Start tracing allocations if not already tracing."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Stop tracing and drop stored snapshots."""
+        tracemalloc.stop()
+        self._snapshots.clear()
+
+    def snapshot(self) -> int:
+        """Take a snapshot and return its id."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self._snapshots[snapshot_id] = tracemalloc.take_snapshot()
+        while len(self._snapshots) > self.max_snapshots:
+            del self._snapshots[min(self._snapshots)]
+        return snapshot_id
+
+    def top(self, snapshot_id: int, limit: int = 20) -> List[dict]:
+        """Return the largest allocation sites in a snapshot."""
+        stats = self._get(snapshot_id).statistics("lineno")[:limit]
+        return [
+            {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in stats
+        ]
+
+    def diff(self, base_id: int, target_id: int, limit: int = 20) -> List[dict]:
+        """Return the allocation sites that changed most between snapshots."""
+        stats = self._get(target_id).compare_to(self._get(base_id), "lineno")
+        return [
+            {
+                "location": str(stat.traceback),
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        try:
+            return self._snapshots[snapshot_id]
+        except KeyError:
+            raise KeyError(f"Unknown snapshot: {snapshot_id}") from None
+
+
+admin_router = APIRouter()
+
+
+@admin_router.post("/profile", response_class=PlainTextResponse)
+async def profile_api(
+    request: Request,
+    seconds: float = Query(5.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Sample all threads for N seconds and return collapsed stacks."""
+    profiler: SamplingProfiler = request.app.state.profiler
+    try:
+        return await profiler.profile(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@admin_router.post("/tracemalloc/start")
+async def tracemalloc_start_api(request: Request, frames: int = Query(1, ge=1)):
+    """Start tracing memory allocations."""
+    request.app.state.memory_tracer.start(frames)
+    return {"tracing": True}
+
+
+@admin_router.post("/tracemalloc/stop")
+async def tracemalloc_stop_api(request: Request):
+    """Stop tracing memory allocations."""
+    request.app.state.memory_tracer.stop()
+    return {"tracing": False}
+
+
+@admin_router.post("/tracemalloc/snapshot")
+async def tracemalloc_snapshot_api(request: Request, limit: int = Query(20, ge=1)):
+    """Take a tracemalloc snapshot and return its top allocation sites."""
+    tracer: MemoryTracer = request.app.state.memory_tracer
+    try:
+        snapshot_id = tracer.snapshot()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "snapshot_id": snapshot_id,
+        "traced_current": current,
+        "traced_peak": peak,
+        "top": tracer.top(snapshot_id, limit),
+    }
+
+
+@admin_router.get("/tracemalloc/diff")
+async def tracemalloc_diff_api(
+    request: Request,
+    base: int,
+    target: Optional[int] = None,
+    limit: int = Query(20, ge=1),
+):
+    """Diff two snapshots; without ``target`` a fresh snapshot is taken."""
+    tracer: MemoryTracer = request.app.state.memory_tracer
+    try:
+        if target is None:
+            target = tracer.snapshot()
+        return {
+            "base": base,
+            "target": target,
+            "diff": tracer.diff(base, target, limit),
+        }
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@admin_router.get("/admission")
+async def admission_stats_api(request: Request):
+    """Admission control counters: active, queued, admitted and shed by lane."""
+    return request.app.state.admission.stats()
+
+
+@admin_router.get("/coalescing")
+async def coalescing_stats_api(request: Request):
+    """Single-flight counters: requests, executions and coalesced calls."""
+    return request.app.state.single_flight.stats()
+
+
+@admin_router.get("/queries")
+async def hot_queries_api(request: Request, limit: int = Query(20, ge=1)):
+    """Most frequent searches and category filters, and pinned results."""
+    return request.app.state.hot_queries.stats(limit)
@@ -0,0 +1,237 @@
+"""Ranked fuzzy product search backed by a precomputed trigram index.
+
+Query terms are matched against the catalog vocabulary by trigram
+similarity, so typos such as "macbok" still find "macbook". Matching
+products are ranked with BM25 over the name and description fields, using
+per-posting weights computed when the index is built. Postings are stored
+in descending weight order so a top-k query can stop as soon as no unseen
+product could still make the cut (Fagin's threshold algorithm).
+"""
+
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from mcp_service import data
+from mcp_service.executor import IndexCache, get_offloader
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+DEFAULT_SIMILARITY = 0.3
+DEFAULT_LIMIT = 10
+SCAN_BATCH = 64
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    """Return the padded trigrams of a term, e.g. "ab" -> "  a", " ab", "ab "."""
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Trigram vocabulary index plus BM25-weighted postings for a catalog."""
+
+    def __init__(
+        self,
+        products: Sequence[dict],
+        similarity_threshold: float = DEFAULT_SIMILARITY,
+        version: Optional[int] = None,
+    ):
+        self.products = list(products)
+        self.similarity_threshold = similarity_threshold
+        self.version = data.content_version() if version is None else version
+        self._categories = [p["category"].lower() for p in self.products]
+        self._similar_cache: Dict[str, List[Tuple[int, float]]] = {}
+        self._build()
+
+    def _build(self) -> None:
+        term_ids: Dict[str, int] = {}
+        doc_tfs: List[Dict[int, float]] = []
+        doc_lengths: List[float] = []
+
+        for product in self.products:
+            tfs: Dict[int, float] = defaultdict(float)
+            length = 0.0
+            for field, weight in (
+                ("name", NAME_WEIGHT),
+                ("description", DESCRIPTION_WEIGHT),
+            ):
+                for token in tokenize(product.get(field, "")):
+                    term_id = term_ids.setdefault(token, len(term_ids))
+                    tfs[term_id] += weight
+                    length += weight
+            doc_tfs.append(tfs)
+            doc_lengths.append(length)
+
+        num_docs = len(self.products)
+        avg_length = (sum(doc_lengths) / num_docs) if num_docs else 1.0
+        postings: List[List[Tuple[int, float]]] = [[] for _ in term_ids]
+        for doc, tfs in enumerate(doc_tfs):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / avg_length)
+            for term_id, tf in tfs.items():
+                postings[term_id].append((doc, tf * (BM25_K1 + 1) / (tf + norm)))
+        doc_vectors: List[Dict[int, float]] = [{} for _ in range(num_docs)]
+        for term_id, plist in enumerate(postings):
+            df = len(plist)
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            plist[:] = [(doc, weight * idf) for doc, weight in plist]
+            plist.sort(key=lambda posting: -posting[1])
+            for doc, weight in plist:
+                doc_vectors[doc][term_id] = weight
+
+        trigram_terms: Dict[str, List[int]] = defaultdict(list)
+        trigram_counts: List[int] = []
+        for term, term_id in term_ids.items():
+            grams = trigrams(term)
+            trigram_counts.append(len(grams))
+            for gram in grams:
+                trigram_terms[gram].append(term_id)
+
+        self._term_ids = term_ids
+        self._postings = postings
+        self._doc_vectors = doc_vectors
+        self._trigram_terms = dict(trigram_terms)
+        self._trigram_counts = trigram_counts
+
+    def similar_terms(self, token: str) -> List[Tuple[int, float]]:
+        """Return vocabulary terms whose trigram similarity meets the threshold."""
+        cached = self._similar_cache.get(token)
+        if cached is not None:
+            return cached
+
+        grams = trigrams(token)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for term_id in self._trigram_terms.get(gram, ()):
+                shared[term_id] += 1
+
+        matches = []
+        for term_id, count in shared.items():
+            similarity = count / (len(grams) + self._trigram_counts[term_id] - count)
+            if similarity >= self.similarity_threshold:
+                matches.append((term_id, similarity))
+
+        if len(self._similar_cache) >= 10_000:
+            self._similar_cache.clear()
+        self._similar_cache[token] = matches
+        return matches
+
+    def _score(self, doc: int, groups: List[List[Tuple[int, float]]]) -> float:
+        """Score a product: each query token counts its best-matching variant."""
+        vector = self._doc_vectors[doc]
+        return sum(
+            max(similarity * vector.get(term_id, 0.0) for term_id, similarity in group)
+            for group in groups
+        )
+
+    def search(
+        self, query: str, category: str = "", limit: int = DEFAULT_LIMIT
+    ) -> List[dict]:
+        """Return the top ``limit`` products ranked by fuzzy BM25 score."""
+        groups = [self.similar_terms(token) for token in set(tokenize(query))]
+        groups = [group for group in groups if group]
+        if not groups or limit <= 0:
+            return []
+
+        wanted = category.lower()
+        lists = [
+            (index, similarity, self._postings[term_id])
+            for index, group in enumerate(groups)
+            for term_id, similarity in group
+        ]
+        seen: Set[int] = set()
+        top: List[Tuple[float, int]] = []
+        depth = 0
+        while True:
+            for _, _, plist in lists:
+                for doc, _ in plist[depth : depth + SCAN_BATCH]:
+                    if doc in seen:
+                        continue
+                    seen.add(doc)
+                    if wanted and self._categories[doc] != wanted:
+                        continue
+                    # Negate doc so equal scores prefer earlier catalog entries
+                    entry = (self._score(doc, groups), -doc)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+            depth += SCAN_BATCH
+
+            # Upper bound on the score of any product not seen yet
+            bounds = [0.0] * len(groups)
+            for index, similarity, plist in lists:
+                if depth < len(plist):
+                    bounds[index] = max(bounds[index], similarity * plist[depth][1])
+            if not any(bounds) or (len(top) == limit and top[0][0] >= sum(bounds)):
+                break
+
+        return [
+            {
+                "id": self.products[-neg_doc]["id"],
+                "name": self.products[-neg_doc]["name"],
+                "category": self.products[-neg_doc]["category"],
+                "price": self.products[-neg_doc]["price"],
+                "score": round(score, 4),
+            }
+            for score, neg_doc in sorted(top, reverse=True)
+        ]
+
+
+_indexes: IndexCache[FuzzyIndex] = IndexCache(
+    lambda products, version: FuzzyIndex(products, version=version)
+)
+
+
+def get_fuzzy_index() -> FuzzyIndex:
+    """Get the index for the current catalog, rebuilding it if stale."""
+    return _indexes.get()
+
+
+def fuzzy_search(
+    query: str, category: str = "", limit: Optional[int] = None
+) -> List[dict]:
+    """Search the catalog with typo tolerance, best matches first."""
+    if limit is None:
+        limit = DEFAULT_LIMIT
+    return get_fuzzy_index().search(query, category, limit)
+
+
+async def afuzzy_search(
+    query: str, category: str = "", limit: Optional[int] = None
+) -> List[dict]:
+    """Event-loop variant of :func:`fuzzy_search`.
+
+    The index is rebuilt in the background (serving the previous one
+    meanwhile) and searches over large catalogs run in the offload pool.
+    """
+    results, _ = await afuzzy_search_versioned(query, category, limit)
+    return results
+
+
+async def afuzzy_search_versioned(
+    query: str, category: str = "", limit: Optional[int] = None
+) -> Tuple[List[dict], int]:
+    """Like :func:`afuzzy_search`, also returning the index's content version.
+
+    The version is behind ``data.content_version()`` when the results came
+    from the previous index while a rebuild was in progress.
+    """
+    if limit is None:
+        limit = DEFAULT_LIMIT
+    index = await _indexes.aget()
+    results = await get_offloader().run_local(
+        len(index.products), index.search, query, category, limit
+    )
+    return results, index.version
@@ -1,13 +1,107 @@
 """FastAPI server setup for the Product Search MCP service."""
 
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from mcp_service.admission import AdmissionController, AdmissionMiddleware
+from mcp_service.coalescing import SingleFlight
+from mcp_service.compression import CompressedResponseCache, CompressionMiddleware
+from mcp_service.handlers import hot_queries, router
+from mcp_service.warmup import WarmUp
+
+# Generated OpenAPI schemas, keyed by the create_app() options that change
+# the route table. Every app built with the same options has the same
+# schema, so it is only generated once per process.
+_openapi_schemas: Dict[Tuple, dict] = {}
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _install_openapi_cache(app: FastAPI, key: Tuple) -> None:
+    """Serve the app's OpenAPI schema from the process-wide cache."""
+
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            if key not in _openapi_schemas:
+                _openapi_schemas[key] = FastAPI.openapi(app)
+            app.openapi_schema = _openapi_schemas[key]
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Recover persisted catalog state, then run the warm-up.
+
+    With ``MCP_DATA_DIR`` set, the catalog is recovered from its snapshot
+    and write-ahead log before the server accepts connections, and further
+    changes are logged there. Logging does not block the event loop:
+    coroutines that change the catalog ``await app.state.wal.commit()``
+    before acknowledging. ``MCP_WAL_SYNC=1`` instead makes every change
+    wait for its fsync on the changing thread, which is only suitable when
+    all changes are made from worker threads.
 
-from mcp_service.handlers import router
+    The warm-up finishes before connections are accepted in fast-start
+    mode; otherwise it runs in the background while ``/ready`` reports
+    progress.
+    """
+    wal = None
+    data_dir = os.environ.get("MCP_DATA_DIR")
+    if data_dir:
+        from mcp_service.persistence import WriteAheadLog
 
+        wal = WriteAheadLog(data_dir, synchronous=_env_flag("MCP_WAL_SYNC"))
+        app.state.recovery = await asyncio.to_thread(wal.open)
+    app.state.wal = wal
+
+    warm_up: WarmUp = app.state.warm_up
+    task = None
+    if app.state.fast_start:
+        await warm_up.run()
+    else:
+        task = asyncio.create_task(warm_up.run())
+    try:
+        yield
+    finally:
+        if task is not None:
+            task.cancel()
+        if wal is not None:
+            await asyncio.to_thread(wal.close)
+
+
+def create_app(
+    enable_admin: Optional[bool] = None,
+    admission: Optional[AdmissionController] = None,
+    fast_start: Optional[bool] = None,
+) -> FastAPI:
+    """Create and configure the FastAPI application.
+
+    The admin/profiling surface is opt-in: pass ``enable_admin=True`` or set
+    ``MCP_SERVICE_ADMIN=1`` in the environment. Admission control limits
+    come from the environment unless an ``admission`` controller is given.
+
+    ``fast_start=True`` (or ``MCP_FAST_START=1``) is the startup-optimized
+    mode for autoscaled workers: the docs UIs are not mounted and the
+    warm-up completes before the server accepts connections.
+    """
+    if enable_admin is None:
+        enable_admin = _env_flag("MCP_SERVICE_ADMIN")
+    if fast_start is None:
+        fast_start = _env_flag("MCP_FAST_START")
 
-def create_app() -> FastAPI:
-    """Create and configure the FastAPI application."""
     app = FastAPI(
         title="Product Search MCP Service",
         description=(
@@ -15,9 +109,13 @@ def create_app() -> FastAPI:
             "and inventory management"
         ),
         version="0.1.0",
-        docs_url="/docs",
-        redoc_url="/redoc",
+        docs_url=None if fast_start else "/docs",
+        redoc_url=None if fast_start else "/redoc",
+        lifespan=_lifespan,
     )
+    app.state.fast_start = fast_start
+    app.state.warm_up = WarmUp()
+    _install_openapi_cache(app, key=(enable_admin,))
 
     # Add CORS middleware
     app.add_middleware(
@@ -28,9 +126,29 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Compress large responses; hot queries are cached pre-compressed
+    app.state.response_cache = CompressedResponseCache()
+    app.add_middleware(CompressionMiddleware, cache=app.state.response_cache)
+
+    # Rate limit and shed load before any other work is done for a request
+    app.state.admission = admission or AdmissionController.from_env()
+    app.add_middleware(AdmissionMiddleware, controller=app.state.admission)
+
+    # Identical concurrent MCP calls share one computation
+    app.state.single_flight = SingleFlight()
+    app.state.hot_queries = hot_queries
+
     # Include routers
     app.include_router(router, prefix="/api/v1")
 
+    if enable_admin:
+        from mcp_service.profiling import MemoryTracer, SamplingProfiler, admin_router
+
+        app.state.profiler = SamplingProfiler()
+        app.state.memory_tracer = MemoryTracer()
+        app.state.server_timing = True
+        app.include_router(admin_router, prefix="/admin")
+
     @app.get("/")
     async def root():
         """Root endpoint."""
@@ -40,7 +158,9 @@ def create_app() -> FastAPI:
             "service": "Product Search MCP Service",
             "endpoints": {
                 "mcp": "/api/v1/mcp/message",
+                "mcp_websocket": "/api/v1/mcp/ws",
                 "capabilities": "/api/v1/mcp/capabilities",
+                "ready": "/ready",
                 "docs": "/docs",
             },
         }
@@ -54,4 +174,12 @@ def create_app() -> FastAPI:
             "version": "0.1.0",
         }
 
+    @app.get("/ready")
+    async def readiness_check():
+        """Readiness endpoint: 503 until the warm-up has finished."""
+        warm_up: WarmUp = app.state.warm_up
+        return JSONResponse(
+            warm_up.progress(), status_code=200 if warm_up.ready else 503
+        )
+
     return app
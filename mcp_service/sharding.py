@@ -0,0 +1,126 @@
+"""Sharded catalog with scatter-gather search across worker processes.
+
+The catalog is partitioned by a stable hash of the product id. Each shard is
+served by its own single-worker process pool holding only its partition, so
+scans run in parallel without contending for one GIL. Searches fan out to
+every shard (with sort and limit pushed down) and the partial results are
+merged.
+
+Point lookups are not routed to shards: the parent resolves them from its
+id index in well under a microsecond, far less than a round trip to a
+worker process.
+"""
+
+import asyncio
+import heapq
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence
+
+from mcp_service import data
+from mcp_service.executor import _call, _load_catalog
+
+
+def shard_for(product_id: str, num_shards: int) -> int:
+    """Return the shard that owns a product id."""
+    return zlib.crc32(product_id.encode()) % num_shards
+
+
+class ShardedCatalog:
+    """A catalog partitioned across N local worker processes."""
+
+    def __init__(
+        self,
+        num_shards: int,
+        products: Optional[Sequence[dict]] = None,
+        version: Optional[int] = None,
+    ):
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        if products is None:
+            products = data.PRODUCTS
+        self.num_shards = num_shards
+        self.version = data.content_version() if version is None else version
+        self._positions: Dict[str, int] = {}
+        partitions: List[List[dict]] = [[] for _ in range(num_shards)]
+        for position, product in enumerate(products):
+            self._positions[product["id"]] = position
+            partitions[shard_for(product["id"], num_shards)].append(product)
+        self._shards = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_load_catalog,
+                initargs=(partition, self.version),
+            )
+            for partition in partitions
+        ]
+
+    def start(self) -> None:
+        """Start every shard worker and wait until its partition is loaded.
+
+        Workers otherwise start on the first search, which then pays for
+        the process start and for loading the partitions.
+        """
+        for future in [shard.submit(int) for shard in self._shards]:
+            future.result()
+
+    def _scatter(self, func_name: str, *args: Any) -> List[Future]:
+        return [shard.submit(_call, func_name, *args) for shard in self._shards]
+
+    def _merge(
+        self, partials: List[list], sort: str, limit: Optional[int]
+    ) -> List[dict]:
+        """Merge per-shard results that are each already ordered."""
+        positions = self._positions
+        if not sort:
+            merged = heapq.merge(*partials, key=lambda p: positions[p["id"]])
+            return list(islice(merged, limit))
+
+        # Ties are broken by catalog position, matching data.search_products
+        field, descending = data.parse_sort(sort)
+        sign = -1 if descending else 1
+        merged = heapq.merge(
+            *partials,
+            key=lambda p: (p[field], sign * positions[p["id"]]),
+            reverse=descending,
+        )
+        return list(islice(merged, limit))
+
+    def search_products(
+        self,
+        query: str = "",
+        category: str = "",
+        sort: str = "",
+        limit: Optional[int] = None,
+    ) -> list:
+        """Search all shards in parallel and merge the results."""
+        if sort:
+            data.parse_sort(sort)
+        futures = self._scatter("search_products", query, category, sort, limit)
+        return self._merge([f.result() for f in futures], sort, limit)
+
+    async def asearch_products(
+        self,
+        query: str = "",
+        category: str = "",
+        sort: str = "",
+        limit: Optional[int] = None,
+    ) -> list:
+        """Async variant of :meth:`search_products` for the event loop."""
+        if sort:
+            data.parse_sort(sort)
+        futures = self._scatter("search_products", query, category, sort, limit)
+        partials = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        return self._merge(list(partials), sort, limit)
+
+    def close(self) -> None:
+        """Shut down all shard workers, waiting for pending searches.
+
+        Waiting also lets each pool finish tearing down: a pool left to
+        shut down in the background can still be mid-teardown at
+        interpreter exit, when ``concurrent.futures`` wakes it through a
+        pipe that is already closed.
+        """
+        for shard in self._shards:
+            shard.shutdown(wait=True)
@@ -0,0 +1,281 @@
+"""Full-text search over product names and descriptions.
+
+Text is tokenized, stopwords are dropped and tokens are reduced with a light
+suffix-stripping stemmer. Each term's postings are stored as a single
+``bytes`` object holding delta-encoded document ids and token positions as
+varints, which keeps the index compact at millions of products.
+
+Queries support implicit AND between terms, ``OR`` between groups and
+``"quoted phrases"``::
+
+    titanium laptop OR "running shoes"
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from mcp_service import data
+from mcp_service.executor import IndexCache, get_offloader
+from mcp_service.search_index import tokenize
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or "
+    "that the this to was were will with".split()
+)
+
+# Position gap between name and description so phrases never span fields
+FIELD_GAP = 100
+
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+Clause = Tuple[Tuple[int, str], ...]
+
+
+def stem(token: str) -> str:
+    """Strip common English suffixes ("shoes" -> "shoe", "running" -> "run")."""
+    if token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        token = token[:-1]
+
+    for suffix in ("ing", "ed"):
+        root = token[: -len(suffix)]
+        if token.endswith(suffix) and len(root) >= 3 and re.search("[aeiouy]", root):
+            if root[-1] == root[-2] and root[-1] not in "lsz":
+                root = root[:-1]
+            return root
+
+    if token.endswith("ly") and len(token) > 5:
+        return token[:-2]
+    return token
+
+
+def analyze(text: str) -> List[Tuple[int, str]]:
+    """Return (position, term) pairs, keeping stopword slots in the positions."""
+    return [
+        (position, stem(token))
+        for position, token in enumerate(tokenize(text))
+        if token not in STOPWORDS
+    ]
+
+
+def _write_varint(buf: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varints(encoded: bytes) -> Iterator[int]:
+    value = shift = 0
+    for byte in encoded:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def decode_postings(encoded: bytes) -> List[Tuple[int, List[int]]]:
+    """Decode a posting list into (doc, positions) pairs."""
+    values = _read_varints(encoded)
+    postings = []
+    doc = 0
+    for doc_delta in values:
+        doc += doc_delta
+        position = 0
+        positions = []
+        for _ in range(next(values)):
+            position += next(values)
+            positions.append(position)
+        postings.append((doc, positions))
+    return postings
+
+
+def parse_query(query: str) -> List[List[Clause]]:
+    """Parse a query into OR-groups of AND-ed clauses.
+
+    A clause is a tuple of (relative position, term); single terms are
+    one-element clauses and phrases carry their word offsets.
+    """
+    groups: List[List[Clause]] = [[]]
+    for match in QUERY_RE.finditer(query):
+        phrase, word = match.groups()
+        if word in ("OR", "|"):
+            groups.append([])
+            continue
+        if word == "AND":
+            continue
+        clause = tuple(analyze(phrase if phrase is not None else word))
+        if clause:
+            base = clause[0][0]
+            groups[-1].append(tuple((pos - base, term) for pos, term in clause))
+    return [group for group in groups if group]
+
+
+class FullTextIndex:
+    """Compressed positional inverted index over a catalog."""
+
+    def __init__(self, products: Sequence[dict], version: Optional[int] = None):
+        self.products = list(products)
+        self.version = data.content_version() if version is None else version
+        self._build()
+
+    def _build(self) -> None:
+        buffers: Dict[str, bytearray] = {}
+        last_doc: Dict[str, int] = {}
+        doc_freq: Dict[str, int] = {}
+
+        for doc, product in enumerate(self.products):
+            name_terms = analyze(product.get("name", ""))
+            offset = (name_terms[-1][0] + FIELD_GAP) if name_terms else 0
+            positions: Dict[str, List[int]] = {}
+            for position, term in name_terms:
+                positions.setdefault(term, []).append(position)
+            for position, term in analyze(product.get("description", "")):
+                positions.setdefault(term, []).append(position + offset)
+
+            for term, term_positions in positions.items():
+                buf = buffers.get(term)
+                if buf is None:
+                    buf = buffers[term] = bytearray()
+                _write_varint(buf, doc - last_doc.get(term, 0))
+                _write_varint(buf, len(term_positions))
+                previous = 0
+                for position in term_positions:
+                    _write_varint(buf, position - previous)
+                    previous = position
+                last_doc[term] = doc
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        self._postings: Dict[str, bytes] = {t: bytes(b) for t, b in buffers.items()}
+        self._doc_freq = doc_freq
+
+    def memory_bytes(self) -> int:
+        """Total size of the encoded posting lists."""
+        return sum(len(encoded) for encoded in self._postings.values())
+
+    def estimate_cost(self, query: str) -> int:
+        """Estimate a query's cost as the number of postings it decodes."""
+        return sum(
+            self._doc_freq.get(term, 0)
+            for group in parse_query(query)
+            for clause in group
+            for _, term in clause
+        )
+
+    def _match_clause(self, clause: Clause) -> Set[int]:
+        if len(clause) == 1:
+            encoded = self._postings.get(clause[0][1], b"")
+            return {doc for doc, _ in decode_postings(encoded)}
+
+        # Phrase: intersect on documents, rarest term first, then check offsets
+        ordered = sorted(clause, key=lambda item: self._doc_freq.get(item[1], 0))
+        term_positions: Dict[str, Dict[int, Set[int]]] = {}
+        candidates: Optional[Set[int]] = None
+        for _, term in ordered:
+            if term in term_positions:
+                continue
+            postings = {
+                doc: set(positions)
+                for doc, positions in decode_postings(self._postings.get(term, b""))
+                if candidates is None or doc in candidates
+            }
+            term_positions[term] = postings
+            candidates = set(postings)
+            if not candidates:
+                return set()
+
+        first_offset, first_term = clause[0]
+        matches = set()
+        for doc in candidates or ():
+            for start in term_positions[first_term][doc]:
+                if all(
+                    start + offset - first_offset in term_positions[term][doc]
+                    for offset, term in clause[1:]
+                ):
+                    matches.add(doc)
+                    break
+        return matches
+
+    def _match_group(self, group: List[Clause]) -> Set[int]:
+        ordered = sorted(
+            group, key=lambda c: min(self._doc_freq.get(t, 0) for _, t in c)
+        )
+        docs = self._match_clause(ordered[0])
+        for clause in ordered[1:]:
+            if not docs:
+                break
+            docs &= self._match_clause(clause)
+        return docs
+
+    def search(
+        self,
+        query: str,
+        category: str = "",
+        sort: str = "",
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Evaluate a boolean/phrase query; results follow ``search_products``."""
+        docs: Set[int] = set()
+        for group in parse_query(query):
+            docs |= self._match_group(group)
+
+        wanted = category.lower()
+        results = (
+            {
+                "id": product["id"],
+                "name": product["name"],
+                "category": product["category"],
+                "price": product["price"],
+            }
+            for product in (self.products[doc] for doc in sorted(docs))
+            if not wanted or wanted == product["category"].lower()
+        )
+        return data.order_results(results, sort, limit)
+
+
+_indexes: IndexCache[FullTextIndex] = IndexCache(FullTextIndex)
+
+
+def get_text_index() -> FullTextIndex:
+    """Get the index for the current catalog, rebuilding it if stale."""
+    return _indexes.get()
+
+
+def text_search(
+    query: str, category: str = "", sort: str = "", limit: Optional[int] = None
+) -> List[dict]:
+    """Full-text search over names and descriptions."""
+    return get_text_index().search(query, category, sort, limit)
+
+
+async def atext_search(
+    query: str, category: str = "", sort: str = "", limit: Optional[int] = None
+) -> List[dict]:
+    """Event-loop variant of :func:`text_search`.
+
+    The index is rebuilt in the background (serving the previous one
+    meanwhile), and queries that decode many postings, such as a common
+    term, run in the offload pool.
+    """
+    results, _ = await atext_search_versioned(query, category, sort, limit)
+    return results
+
+
+async def atext_search_versioned(
+    query: str, category: str = "", sort: str = "", limit: Optional[int] = None
+) -> Tuple[List[dict], int]:
+    """Like :func:`atext_search`, also returning the index's content version.
+
+    The version is behind ``data.content_version()`` when the results came
+    from the previous index while a rebuild was in progress.
+    """
+    index = await _indexes.aget()
+    results = await get_offloader().run_local(
+        index.estimate_cost(query), index.search, query, category, sort, limit
+    )
+    return results, index.version
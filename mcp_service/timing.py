@@ -0,0 +1,53 @@
+"""``Server-Timing`` recorder used by the MCP message handler.
+
+Kept apart from ``profiling`` so the request path does not import the
+admin surface (and ``tracemalloc``) when admin routes are disabled.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class ServerTiming:
+    """Collect named durations and render them as a ``Server-Timing`` header.
+
+    Measurements may nest; time spent in an inner block is attributed to the
+    inner name only, so the reported metrics never overlap.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._nested: List[float] = []
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Add the time spent inside the block to the ``name`` metric."""
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self.durations[name] = self.durations.get(name, 0.0) + own
+
+    def header(self) -> str:
+        """Render the collected durations in milliseconds."""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.3f}"
+            for name, seconds in self.durations.items()
+        )
+
+
+class _NullTiming(ServerTiming):
+    """Timing recorder that records nothing, used when timing is disabled."""
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        yield
+
+
+NULL_TIMING = _NullTiming()
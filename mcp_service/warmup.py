@@ -0,0 +1,130 @@
+"""Warm-up phase that prepares a worker before it takes traffic.
+
+The fuzzy, full-text and facet indexes are otherwise built lazily by the
+first request that needs them, which then pays the whole build cost. The
+warm-up builds them, pre-serializes the capabilities document and replays
+a sample of hot queries through the MCP dispatcher, so code paths, the
+offload thread pool and serializers are warm as well. ``/ready`` reports
+its progress and answers 503 until it has finished.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import List, Optional
+
+from mcp_service import data
+from mcp_service.facets import get_facet_aggregates
+from mcp_service.handlers import capabilities_json, dispatch_mcp_request
+from mcp_service.models import MCPRequest
+from mcp_service.search_index import get_fuzzy_index
+from mcp_service.text_index import get_text_index
+
+INDEX_STEPS = (
+    ("fuzzy_index", get_fuzzy_index),
+    ("text_index", get_text_index),
+    ("facets", get_facet_aggregates),
+    ("capabilities", capabilities_json),
+)
+
+
+def default_warm_up_queries() -> List[dict]:
+    """A sample of typical tool calls derived from the current catalog."""
+    queries: List[dict] = [
+        {"method": "search_products", "params": {}},
+        {"method": "facets", "params": {}},
+    ]
+    for category in data.get_all_categories():
+        queries.append({"method": "search_products", "params": {"category": category}})
+    if data.PRODUCTS:
+        name = data.PRODUCTS[0]["name"]
+        for mode in ("substring", "fuzzy", "text"):
+            queries.append(
+                {"method": "search_products", "params": {"query": name, "mode": mode}}
+            )
+    return queries
+
+
+def load_warm_up_queries() -> List[dict]:
+    """Queries to replay: ``MCP_WARM_UP_QUERIES`` (a JSON file), else defaults.
+
+    The file holds a list of ``{"method": ..., "params": {...}}`` objects,
+    for example captured from production traffic.
+    """
+    path = os.environ.get("MCP_WARM_UP_QUERIES")
+    if not path:
+        return default_warm_up_queries()
+    with open(path) as f:
+        return json.load(f)
+
+
+class WarmUp:
+    """Runs the warm-up steps and tracks progress for ``/ready``."""
+
+    def __init__(self, queries: Optional[List[dict]] = None):
+        self.queries = queries
+        self.status = "pending"
+        self.current: Optional[str] = None
+        self.completed: List[str] = []
+        self.timings: dict = {}
+        self.error: Optional[str] = None
+        self.catalog_version: Optional[int] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    @property
+    def total_steps(self) -> int:
+        return len(INDEX_STEPS) + 1
+
+    async def run(self) -> None:
+        """Run every step; index builds happen off the event loop."""
+        self.status = "warming"
+        try:
+            for name, step in INDEX_STEPS:
+                await self._step(name, asyncio.to_thread(step))
+            await self._step("hot_queries", self._replay())
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            return
+        self.current = None
+        self.catalog_version = data.catalog_version()
+        self.status = "ready"
+
+    async def _step(self, name: str, work) -> None:
+        self.current = name
+        start = time.perf_counter()
+        await work
+        self.timings[name] = time.perf_counter() - start
+        self.completed.append(name)
+
+    async def _replay(self) -> None:
+        queries = self.queries
+        if queries is None:
+            queries = await asyncio.to_thread(load_warm_up_queries)
+        for query in queries:
+            response = await dispatch_mcp_request(
+                MCPRequest(
+                    id="warm-up", method=query["method"], params=query.get("params", {})
+                )
+            )
+            response.model_dump_json()
+
+    def progress(self) -> dict:
+        """Progress report served by ``/ready``."""
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "current_step": self.current,
+            "completed_steps": self.completed,
+            "progress": round(len(self.completed) / self.total_steps, 2),
+            "timings_ms": {
+                name: round(seconds * 1000, 2) for name, seconds in self.timings.items()
+            },
+            "error": self.error,
+            "warmed_catalog_version": self.catalog_version,
+            "catalog_version": data.catalog_version(),
+        }
@@ -0,0 +1,15 @@
+"""Shared test fixtures."""
+
+import copy
+
+import pytest
+
+from mcp_service import data
+
+
+@pytest.fixture
+def catalog():
+    """Restore the sample catalog after a test mutates it."""
+    saved = copy.deepcopy(data.PRODUCTS)
+    yield saved
+    data.load_products(saved)
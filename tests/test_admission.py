@@ -0,0 +1,148 @@
+"""Tests for admission control, rate limiting and load shedding."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from mcp_service.admission import (
+    HIGH,
+    LOW,
+    NORMAL,
+    AdmissionController,
+    PriorityLimiter,
+    TokenBucket,
+    classify_mcp,
+    classify_rest,
+)
+from mcp_service.server import create_app
+
+
+def test_token_bucket_refills():
+    """Test that a bucket allows a burst, then refills at its rate."""
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+    assert bucket.try_acquire(now)
+    assert bucket.try_acquire(now)
+    assert not bucket.try_acquire(now)
+    assert bucket.try_acquire(now + 0.2)
+
+
+def test_classification():
+    """Test priority lanes for MCP methods and REST routes."""
+    assert classify_mcp("ping", {}) == HIGH
+    assert classify_mcp("check_inventory", {"product_id": "1"}) == HIGH
+    assert classify_mcp("search_products", {"query": "laptop"}) == NORMAL
+    assert classify_mcp("search_products", {}) == LOW
+    assert classify_rest("/api/v1/products/search", b"") == LOW
+    assert classify_rest("/api/v1/products/search", b"query=mouse") == NORMAL
+    assert classify_rest("/api/v1/products/3/inventory", b"") == HIGH
+
+
+def test_rate_limit_is_per_client():
+    """Test that one client's limit does not affect another's."""
+    controller = AdmissionController(rate=0.001, burst=2)
+    client = TestClient(create_app(admission=controller))
+    body = {"id": 7, "method": "ping", "params": {}}
+    headers = {"X-Client-Key": "agent-a"}
+
+    for _ in range(2):
+        assert client.post("/api/v1/mcp/message", json=body, headers=headers).is_success
+    response = client.post("/api/v1/mcp/message", json=body, headers=headers)
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+    assert response.json()["id"] == 7
+    assert response.json()["error"]["code"] == -32000
+
+    rest = client.get("/api/v1/products/1", headers=headers)
+    assert rest.status_code == 429
+    assert rest.json() == {"detail": "Rate limit exceeded"}
+
+    other = client.get("/api/v1/products/1", headers={"X-Client-Key": "agent-b"})
+    assert other.status_code == 200
+    assert client.get("/health").status_code == 200
+    assert controller.stats()["rate_limited"] == 2
+
+
+def test_websocket_handshake_and_frames_are_rate_limited():
+    """Test that the WebSocket cannot be used to bypass admission control."""
+    controller = AdmissionController(rate=0.001, burst=3)
+    client = TestClient(create_app(admission=controller))
+    headers = {"X-Client-Key": "agent-ws"}
+
+    # The handshake takes one token and each frame one more
+    with client.websocket_connect("/api/v1/mcp/ws", headers=headers) as ws:
+        for i in range(3):
+            ws.send_json({"id": i, "method": "ping", "params": {}})
+        responses = [ws.receive_json() for _ in range(3)]
+    errors = [r for r in responses if r["error"] is not None]
+    assert len(errors) == 1
+    assert errors[0]["error"] == {"code": -32000, "message": "Rate limit exceeded"}
+    assert errors[0]["id"] in range(3)
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/mcp/ws", headers=headers):
+            pass
+    stats = controller.stats()
+    assert stats["rate_limited"] == 2
+    assert stats["admitted"]["high"] == 2
+    assert stats["active"] == 0
+
+
+def test_high_priority_waiters_run_first():
+    """Test that a freed slot goes to the highest-priority waiter."""
+
+    async def scenario():
+        limiter = PriorityLimiter(max_concurrency=1, max_queue=10, max_wait=1)
+        order = []
+        assert await limiter.acquire(NORMAL)
+
+        async def worker(lane, name):
+            assert await limiter.acquire(lane)
+            order.append(name)
+            limiter.release()
+
+        tasks = [
+            asyncio.create_task(worker(LOW, "low")),
+            asyncio.create_task(worker(NORMAL, "normal")),
+            asyncio.create_task(worker(HIGH, "high")),
+        ]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order, limiter.active
+
+    order, active = asyncio.run(scenario())
+    assert order == ["high", "normal", "low"]
+    assert active == 0
+
+
+def test_full_queue_sheds_lower_priority():
+    """Test that a full queue sheds low-priority waiters, then fails fast."""
+
+    async def scenario():
+        limiter = PriorityLimiter(max_concurrency=1, max_queue=1, max_wait=1)
+        assert await limiter.acquire(NORMAL)
+        low = asyncio.create_task(limiter.acquire(LOW))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(limiter.acquire(HIGH))
+        await asyncio.sleep(0)
+        # The queue is full of a higher lane, so another low request fails
+        rejected = await limiter.acquire(LOW)
+        limiter.release()
+        return await low, await high, rejected
+
+    assert asyncio.run(scenario()) == (False, True, False)
+
+
+def test_queue_wait_times_out():
+    """Test that waiting longer than max_wait rejects the request."""
+
+    async def scenario():
+        limiter = PriorityLimiter(max_concurrency=1, max_queue=5, max_wait=0.01)
+        assert await limiter.acquire(HIGH)
+        rejected = await limiter.acquire(HIGH)
+        return rejected, limiter.queued
+
+    assert asyncio.run(scenario()) == (False, 0)
@@ -0,0 +1,159 @@
+"""Tests for hot-query analytics and pinned results."""
+
+import asyncio
+import random
+
+from fastapi.testclient import TestClient
+
+from mcp_service import data, handlers
+from mcp_service.analytics import CountMinSketch, HeavyHitters, HotQueries
+from mcp_service.server import create_app
+
+
+def test_count_min_sketch_never_undercounts():
+    """Test sketch estimates against exact counts."""
+    sketch = CountMinSketch(width=64, depth=4)
+    exact = {}
+    rng = random.Random(1)
+    for _ in range(2000):
+        key = f"q{rng.randint(0, 300)}"
+        exact[key] = exact.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in exact.items())
+
+
+def test_heavy_hitters_find_the_top_keys():
+    """Test that frequent keys are tracked among many rare ones."""
+    hitters = HeavyHitters(capacity=5)
+    rng = random.Random(2)
+    for i in range(5000):
+        hitters.add(f"hot{i % 3}" if i % 4 == 0 else f"rare{rng.random()}")
+    top = hitters.top()
+    assert len(top) == 5
+    assert {key for key, _ in top[:3]} == {"hot0", "hot1", "hot2"}
+    assert hitters.total == 5000
+
+
+def test_hot_queries_are_pinned_per_content_version():
+    """Test precomputation, pin hits and refresh after a catalog change."""
+    computed = []
+
+    async def compute(key):
+        computed.append((key, data.content_version()))
+        return {"key": key, "version": data.content_version()}, data.content_version()
+
+    async def scenario():
+        hot = HotQueries(compute, min_count=3, refresh_every=5, min_refresh_interval=0)
+        for _ in range(5):
+            assert hot.record("laptops") is None
+        await asyncio.sleep(0)  # let the scheduled refresh run
+        first = hot.record("laptops")
+
+        data.mark_catalog_changed()
+        stale = hot.record("laptops")
+        await asyncio.sleep(0)
+        refreshed = hot.record("laptops")
+        return hot, first, stale, refreshed
+
+    hot, first, stale, refreshed = asyncio.run(scenario())
+    assert first["key"] == "laptops"
+    assert stale is None
+    assert refreshed["version"] == data.content_version()
+    assert len(computed) == 2
+    assert hot.stats()["pin_hits"] == 2
+
+
+def test_pin_from_a_stale_index_is_not_served(catalog):
+    """Test that a pin computed while its index rebuilds is recomputed."""
+    from mcp_service import text_index
+    from mcp_service.models import ProductSearchRequest
+
+    key = ProductSearchRequest(query="zebra", mode="text").model_dump_json()
+    hot = HotQueries(handlers._pinned_search, min_count=1, min_refresh_interval=60)
+
+    async def scenario():
+        text_index.get_text_index()
+        hot.record(key)
+        data.load_products(catalog + [{**catalog[0], "id": "z1", "name": "Zebra Mug"}])
+        await hot.refresh()  # searches the previous index, still being rebuilt
+        stale = hot.record(key)
+        text_index.get_text_index()
+        await hot.refresh()
+        return stale, hot.record(key)
+
+    stale, fresh = asyncio.run(scenario())
+    assert stale is None
+    assert fresh["count"] == 1
+
+
+def test_admin_endpoint_reports_and_pins_hot_searches(monkeypatch):
+    """Test that hot searches are served from pins and reported."""
+    searches = []
+    run_search = handlers._run_search
+
+    async def counting_search(*args):
+        searches.append(args)
+        return await run_search(*args)
+
+    monkeypatch.setattr(handlers, "_run_search", counting_search)
+    hot = HotQueries(handlers._pinned_search, min_count=3, refresh_every=4)
+    monkeypatch.setattr(handlers, "hot_queries", hot)
+    app = create_app(enable_admin=True)
+    app.state.hot_queries = hot
+    client = TestClient(app)
+
+    body = {"method": "search_products", "params": {"category": "Electronics"}}
+    results = [
+        client.post("/api/v1/mcp/message", json={"id": i, **body}).json()
+        for i in range(10)
+    ]
+    assert all(r["result"] == results[0]["result"] for r in results)
+    # 4 searches until the refresh, 1 to precompute it, then 6 pinned
+    assert len(searches) == 5
+
+    stats = client.get("/admin/queries").json()
+    assert stats["total_queries"] == 10
+    assert stats["top_queries"][0]["estimated_count"] == 10
+    assert stats["top_categories"] == [
+        {"category": "Electronics", "estimated_count": 10}
+    ]
+    assert stats["pinned"][0]["current"] is True
+    assert stats["pin_hits"] == 6
+
+
+def test_coalesced_searches_are_each_counted(monkeypatch):
+    """Test that every caller of a coalesced burst is counted, warm-up none."""
+    from mcp_service.coalescing import SingleFlight
+    from mcp_service.warmup import WarmUp
+
+    hot = HotQueries(handlers._pinned_search, pin_count=0)
+    monkeypatch.setattr(handlers, "hot_queries", hot)
+    flight = SingleFlight()
+    request = handlers.parse_mcp_call(
+        '{"id": 1, "method": "search_products", "params": {"query": "Pro"}}'
+    )
+
+    async def scenario():
+        await asyncio.gather(*(handlers._respond(request, flight) for _ in range(50)))
+        await WarmUp(queries=[{"method": "search_products", "params": {}}])._replay()
+
+    asyncio.run(scenario())
+    assert flight.stats()["coalesced"] == 49
+    assert hot.queries.total == 50
+    assert [count for _, count in hot.queries.top()] == [50]
+
+
+def test_compressed_mcp_searches_are_each_counted(monkeypatch, catalog):
+    """Test that repeated gzip MCP searches are not answered from a cache."""
+    hot = HotQueries(handlers._pinned_search, pin_count=0)
+    monkeypatch.setattr(handlers, "hot_queries", hot)
+    client = TestClient(create_app())
+    # Enough results for the response to be compressed
+    data.load_products(catalog + [{**catalog[0], "id": f"copy-{i}"} for i in range(20)])
+    body = {"id": 1, "method": "search_products", "params": {"query": ""}}
+    for _ in range(5):
+        response = client.post(
+            "/api/v1/mcp/message", json=body, headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+    assert hot.queries.total == 5
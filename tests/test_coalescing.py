@@ -0,0 +1,139 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_service import handlers
+from mcp_service.coalescing import SingleFlight
+from mcp_service.server import create_app
+
+
+def test_identical_calls_share_one_execution():
+    """Test that concurrent calls with one key run the work once."""
+
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            *(flight.do("a", lambda: work("a")) for _ in range(5)),
+            flight.do("b", lambda: work("b")),
+        )
+        return results, calls, flight.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["a"] * 5 + ["b"]
+    assert sorted(calls) == ["a", "b"]
+    assert stats == {"requests": 6, "executions": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_caller():
+    """Test that a failing flight raises in all coalesced callers."""
+
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        return await asyncio.gather(
+            *(flight.do("k", work) for _ in range(3)), return_exceptions=True
+        )
+
+    assert [str(e) for e in asyncio.run(scenario())] == ["boom"] * 3
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    """Test that a disconnected leader leaves the shared work running."""
+
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        [{"query": "Pro"}, {"mode": "substring", "query": "Pro"}],
+        [{"product_id": "3"}, {"product_id": "3"}],
+    ],
+)
+def test_concurrent_mcp_messages_coalesced(monkeypatch, params):
+    """Test that identical concurrent MCP messages share one dispatch."""
+    method = "search_products" if "query" in params[0] else "check_inventory"
+    dispatch = handlers.dispatch_mcp_request
+    dispatched = []
+
+    async def slow_dispatch(request, *args):
+        dispatched.append(request.id)
+        await asyncio.sleep(0.05)
+        return await dispatch(request, *args)
+
+    monkeypatch.setattr(handlers, "dispatch_mcp_request", slow_dispatch)
+    app = create_app()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(
+                *(
+                    c.post(
+                        "/api/v1/mcp/message",
+                        json={"id": i, "method": method, "params": params[i % 2]},
+                    )
+                    for i in range(6)
+                )
+            )
+
+    responses = asyncio.run(scenario())
+    bodies = [response.json() for response in responses]
+    assert [body["id"] for body in bodies] == list(range(6))
+    assert all(body["result"] == bodies[0]["result"] for body in bodies)
+    assert bodies[0]["error"] is None
+    assert len(dispatched) == 1
+    assert app.state.single_flight.stats()["coalesced"] == 5
+
+
+def test_ping_is_not_coalesced():
+    """Test that only calls to read-only tools go through single-flight."""
+    flight = SingleFlight()
+    ping = handlers.parse_mcp_call('{"id": 1, "method": "ping"}')
+    assert '"pong"' in asyncio.run(handlers._respond(ping, flight))
+    assert flight.stats()["requests"] == 0
+
+
+def test_params_validated_with_the_envelope(monkeypatch):
+    """Test that valid messages are not validated a second time."""
+
+    def second_pass(request):
+        raise AssertionError("params validated again")
+
+    monkeypatch.setattr(handlers, "_validate_params", second_pass)
+    body = {"id": 3, "method": "search_products", "params": {"query": "Pro"}}
+    client = TestClient(create_app())
+    response = client.post("/api/v1/mcp/message", json=body)
+    assert response.json()["result"]["count"] == 2
+    with client.websocket_connect("/api/v1/mcp/ws") as ws:
+        ws.send_json(body)
+        assert ws.receive_json()["result"]["count"] == 2
@@ -0,0 +1,137 @@
+"""Tests for negotiated response compression."""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from mcp_service import compression, data, text_index
+from mcp_service.compression import (
+    CompressedResponseCache,
+    CompressionMiddleware,
+    negotiate,
+)
+from mcp_service.server import create_app
+
+LARGE = "x" * 5000
+
+
+@pytest.fixture
+def app():
+    """A small app wrapped in the compression middleware."""
+    app = FastAPI()
+    calls = {"count": 0}
+    app.state.calls = calls
+    app.state.cache = CompressedResponseCache()
+
+    @app.get("/api/v1/products/search", response_class=PlainTextResponse)
+    async def search():
+        calls["count"] += 1
+        return LARGE
+
+    @app.get("/small", response_class=PlainTextResponse)
+    async def small():
+        return "tiny"
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(4):
+                yield LARGE
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware, cache=app.state.cache)
+    return app
+
+
+def _raw_get(client, path, encoding="gzip"):
+    """Fetch a path without letting the client decode the body."""
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0", None),
+        ("identity", None),
+        ("*", next(iter(compression.ENCODERS))),
+        ("deflate, gzip;q=0.5", "gzip"),
+    ],
+)
+def test_negotiate(header, expected):
+    """Test Accept-Encoding negotiation."""
+    assert negotiate(header) == expected
+
+
+def test_large_response_is_compressed(app):
+    """Test that bodies over the threshold are gzip-compressed."""
+    response, raw = _raw_get(TestClient(app), "/api/v1/products/search")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert gzip.decompress(raw).decode() == LARGE
+    assert len(raw) < len(LARGE)
+
+
+def test_small_response_is_not_compressed(app):
+    """Test that bodies under the threshold pass through."""
+    response, raw = _raw_get(TestClient(app), "/small")
+    assert "content-encoding" not in response.headers
+    assert raw == b"tiny"
+
+
+def test_streaming_response_is_compressed_incrementally(app):
+    """Test compression of a streamed body of unknown length."""
+    response, raw = _raw_get(TestClient(app), "/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw).decode() == LARGE * 4
+
+
+def test_hot_queries_served_precompressed(app):
+    """Test that repeated queries hit the compressed cache."""
+    client = TestClient(app)
+    _, first = _raw_get(client, "/api/v1/products/search")
+    _, second = _raw_get(client, "/api/v1/products/search")
+    assert first == second
+    assert app.state.calls["count"] == 1
+    assert app.state.cache.stats()["hits"] == 1
+
+    # A catalog change invalidates cached entries
+    data.mark_catalog_changed()
+    _raw_get(client, "/api/v1/products/search")
+    assert app.state.calls["count"] == 2
+
+
+def test_cache_is_bounded():
+    """Test LRU eviction by entry count."""
+    cache = CompressedResponseCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put((key,), compression._CachedResponse(200, [], [b"body"]))
+    assert cache.get(("a",)) is None
+    assert cache.get(("c",)) is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_results_from_a_stale_index_are_not_cached(catalog):
+    """Test that a search served while its index rebuilds is not cached."""
+    widgets = [{**catalog[0], "id": f"w{i}", "name": f"Widget {i}"} for i in range(30)]
+    url = "/api/v1/products/search?query=widget&mode=text"
+    headers = {"Accept-Encoding": "gzip"}
+    app = create_app()
+    with TestClient(app) as client:
+        data.load_products(catalog + widgets)
+        text_index.get_text_index()
+        assert len(client.get(url, headers=headers).json()) == 30
+
+        data.load_products(catalog + widgets + [{**widgets[0], "id": "w30"}])
+        stale = client.get(url, headers=headers)
+        assert len(stale.json()) == 30
+        assert stale.headers["cache-control"] == "no-store"
+
+        text_index.get_text_index()
+        assert len(client.get(url, headers=headers).json()) == 31
+    assert app.state.response_cache.stats()["entries"] == 2
@@ -0,0 +1,136 @@
+"""Tests for the offloading execution layer."""
+
+import asyncio
+import threading
+
+import pytest
+
+from mcp_service import data
+from mcp_service.executor import IndexCache, Offloader
+
+
+def test_unknown_mode_rejected():
+    """Test that an unknown offload mode is rejected."""
+    with pytest.raises(ValueError):
+        Offloader(mode="gpu")
+
+
+def test_cheap_search_stays_inline():
+    """Test that searches below the cost threshold run on the caller thread."""
+    offloader = Offloader(mode="thread", cost_threshold=1000)
+    assert not offloader.should_offload(len(data.PRODUCTS))
+    results = asyncio.run(offloader.search_products("iPhone"))
+    assert [p["name"] for p in results] == ["iPhone 15 Pro"]
+    assert offloader._executor is None
+
+
+def test_expensive_search_offloaded_to_thread(monkeypatch):
+    """Test that searches above the threshold run in the thread pool."""
+    seen = []
+    original = data.search_products
+
+    def recording_search(*args):
+        seen.append(threading.current_thread().name)
+        return original(*args)
+
+    monkeypatch.setattr(data, "search_products", recording_search)
+    offloader = Offloader(mode="thread", cost_threshold=0)
+    try:
+        results = asyncio.run(offloader.search_products("", "Electronics"))
+    finally:
+        offloader.shutdown()
+    assert len(results) == 2
+    assert seen[0].startswith("mcp-offload")
+
+
+def test_process_pool_sees_catalog_changes():
+    """Test that process workers are refreshed when the catalog changes."""
+    offloader = Offloader(mode="process", max_workers=1, cost_threshold=0)
+    extra = {
+        "id": "99",
+        "name": "Espresso Grinder",
+        "category": "Appliances",
+        "price": 89.0,
+        "stock": 3,
+        "description": "Burr grinder",
+    }
+    try:
+        assert asyncio.run(offloader.search_products("grinder")) == []
+        data.PRODUCTS.append(extra)
+        data.mark_catalog_changed()
+        results = asyncio.run(offloader.search_products("grinder"))
+        assert [p["id"] for p in results] == ["99"]
+    finally:
+        data.PRODUCTS.remove(extra)
+        data.mark_catalog_changed()
+        offloader.shutdown()
+
+
+def test_index_rebuilt_off_loop_while_stale_index_served():
+    """Test that a stale index keeps serving while a rebuild runs in a thread."""
+    built = []
+
+    class Index:
+        def __init__(self, products, version):
+            built.append(threading.current_thread())
+            self.version = version
+
+    async def scenario():
+        cache = IndexCache(Index)
+        first = await cache.aget()
+        data.mark_catalog_changed()
+        stale = await cache.aget()
+        rebuild = cache._rebuild
+        await rebuild
+        return first, stale, await cache.aget()
+
+    first, stale, fresh = asyncio.run(scenario())
+    assert stale is first
+    assert fresh is not first and fresh.version == data.content_version()
+    assert len(built) == 2
+    assert threading.main_thread() not in built
+
+
+def test_run_local_offloads_in_process_mode():
+    """Test that in-process work uses threads even in process mode."""
+    offloader = Offloader(mode="process", cost_threshold=0)
+    try:
+        name = asyncio.run(
+            offloader.run_local(1, lambda: threading.current_thread().name)
+        )
+    finally:
+        offloader.shutdown()
+    assert name.startswith("mcp-offload")
+    assert offloader._executor is None
+
+
+def test_sharded_catalog_rebuilt_off_loop_and_retired():
+    """Test that old shards serve until new ones are ready, then shut down."""
+    offloader = Offloader(mode="sharded", cost_threshold=0, num_shards=2)
+    extra = {
+        "id": "99",
+        "name": "Espresso Grinder",
+        "category": "Appliances",
+        "price": 89.0,
+        "stock": 3,
+        "description": "Burr grinder",
+    }
+
+    async def scenario():
+        assert await offloader.search_products("grinder") == []
+        old = offloader._sharded.index
+        data.PRODUCTS.append(extra)
+        data.mark_catalog_changed()
+        stale = await offloader.search_products("grinder")
+        await offloader._sharded._rebuild
+        return old, stale, await offloader.search_products("grinder")
+
+    try:
+        old, stale, fresh = asyncio.run(scenario())
+    finally:
+        data.PRODUCTS.remove(extra)
+        data.mark_catalog_changed()
+        offloader.shutdown()
+    assert stale == []
+    assert [p["id"] for p in fresh] == ["99"]
+    assert all(shard._shutdown_thread for shard in old._shards)
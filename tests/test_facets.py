@@ -0,0 +1,106 @@
+"""Tests for catalog mutations and faceted aggregates."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_service import data
+from mcp_service.facets import FacetAggregates, get_facets
+from mcp_service.server import create_app
+
+
+@pytest.fixture
+def aggregates(catalog):
+    """Create aggregates subscribed to catalog changes."""
+    aggregates = FacetAggregates()
+    data.add_catalog_listener(aggregates.on_catalog_change)
+    yield aggregates
+    data.remove_catalog_listener(aggregates.on_catalog_change)
+
+
+def _by_category(facets):
+    return {entry["category"]: entry for entry in facets["categories"]}
+
+
+def test_mutations_notify_listeners(catalog):
+    """Test that mutations bump the version and report old/new products."""
+    changes = []
+
+    def listener(old, new):
+        changes.append((old, new))
+
+    data.add_catalog_listener(listener)
+    try:
+        version = data.catalog_version()
+        data.update_stock("1", 0)
+        assert data.check_inventory("1")["in_stock"] is False
+        assert changes[-1][0]["stock"] == 50 and changes[-1][1]["stock"] == 0
+        assert data.catalog_version() == version + 1
+        assert data.update_stock("999", 1) == {"error": "Product not found"}
+        with pytest.raises(ValueError):
+            data.upsert_product({"id": "5"})
+    finally:
+        data.remove_catalog_listener(listener)
+
+
+def test_facets_match_full_scan():
+    """Test per-category counts, in-stock counts and price ranges."""
+    facets = get_facets()
+    electronics = _by_category(facets)["Electronics"]
+    assert electronics["count"] == 2
+    assert electronics["in_stock"] == 2
+    assert electronics["price_min"] == 999.99
+    assert electronics["price_max"] == 1299.99
+    assert facets["total"]["count"] == len(data.PRODUCTS)
+    buckets = {b["min"]: b["count"] for b in electronics["price_histogram"]}
+    assert buckets[500] == 1 and buckets[1000] == 1
+
+
+def test_aggregates_update_incrementally(aggregates, monkeypatch):
+    """Test that changes are applied without rebuilding the aggregates."""
+    monkeypatch.setattr(
+        aggregates, "rebuild", lambda: pytest.fail("unexpected rebuild")
+    )
+    data.update_stock("3", 0)
+    data.upsert_product(
+        {
+            "id": "5",
+            "name": "Trail Runner",
+            "category": "Footwear",
+            "price": 89.5,
+            "stock": 7,
+            "description": "Grippy trail shoes",
+        }
+    )
+    data.remove_product("2")
+
+    facets = aggregates.facets()
+    footwear = _by_category(facets)["Footwear"]
+    assert footwear["count"] == 2
+    assert footwear["in_stock"] == 1
+    assert footwear["price_min"] == 89.5
+    assert _by_category(facets)["Electronics"]["price_max"] == 999.99
+    assert [
+        c["category"] for c in aggregates.facets(in_stock_only=True)["categories"]
+    ] == ["Appliances", "Electronics", "Footwear"]
+
+
+def test_untracked_change_triggers_rebuild(aggregates, catalog):
+    """Test that direct edits followed by mark_catalog_changed are picked up."""
+    data.PRODUCTS.pop()
+    data.mark_catalog_changed()
+    assert "Appliances" not in _by_category(aggregates.facets())
+
+
+def test_facets_endpoints():
+    """Test the facets MCP tool and REST route."""
+    client = TestClient(create_app())
+    response = client.post(
+        "/api/v1/mcp/message",
+        json={"id": "fc-1", "method": "facets", "params": {"category": "footwear"}},
+    )
+    result = response.json()["result"]
+    assert [c["category"] for c in result["categories"]] == ["Footwear"]
+
+    response = client.get("/api/v1/products/facets?query=pro")
+    assert response.status_code == 200
+    assert response.json()["total"]["count"] == 2
@@ -0,0 +1,77 @@
+"""Tests for the native MCP SDK server."""
+
+import asyncio
+import json
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from mcp_service.main import main
+from mcp_service.mcp_server import create_mcp_server
+
+
+def _run(coro_fn):
+    """Run a coroutine against an in-memory client session."""
+
+    async def runner():
+        server = create_mcp_server()
+        async with create_connected_server_and_client_session(
+            server._mcp_server
+        ) as session:
+            return await coro_fn(session)
+
+    return asyncio.run(runner())
+
+
+def _payload(result):
+    return json.loads(result.content[0].text)
+
+
+def test_list_tools():
+    """Test that the SDK server registers the product tools."""
+
+    async def list_tools(session):
+        return await session.list_tools()
+
+    names = {tool.name for tool in _run(list_tools).tools}
+    assert names == {
+        "search_products",
+        "get_product_details",
+        "check_inventory",
+        "facets",
+    }
+
+
+def test_tool_calls_share_one_session():
+    """Test several tool calls over one long-lived session."""
+
+    async def calls(session):
+        search = await session.call_tool(
+            "search_products", {"query": "macbok", "mode": "fuzzy"}
+        )
+        inventory = await session.call_tool("check_inventory", {"product_id": "3"})
+        return search, inventory
+
+    search, inventory = _run(calls)
+    assert not search.isError
+    assert _payload(search)["products"][0]["name"] == "MacBook Air M3"
+    assert _payload(inventory)["stock"] == 100
+
+
+def test_dispatcher_errors_become_tool_errors():
+    """Test that MCP error responses surface as tool errors."""
+
+    async def bad_call(session):
+        return await session.call_tool("search_products", {"sort": "stock"})
+
+    result = _run(bad_call)
+    assert result.isError
+    assert "Unsupported sort field" in result.content[0].text
+
+
+def test_main_rejects_unknown_transport(capsys):
+    """Test CLI validation of the transport option."""
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--transport", "carrier-pigeon"])
+    assert exc_info.value.code == 2
+    assert "invalid choice" in capsys.readouterr().err
@@ -0,0 +1,204 @@
+"""Tests for write-ahead log persistence of catalog changes."""
+
+import asyncio
+import copy
+import os
+
+import pytest
+
+from mcp_service import data
+from mcp_service.persistence import WriteAheadLog
+
+NEW_PRODUCT = {
+    "id": "100",
+    "name": "Standing Desk",
+    "category": "Furniture",
+    "price": 499.0,
+    "stock": 5,
+    "description": "Electric sit-stand desk",
+}
+
+
+def _restart(directory, original, **kwargs):
+    """Simulate a process restart: reset memory, recover from disk."""
+    data.load_products(copy.deepcopy(original))
+    wal = WriteAheadLog(directory, **kwargs)
+    return wal, wal.open()
+
+
+def test_changes_survive_restart(tmp_path, catalog):
+    """Test that logged mutations are replayed on startup."""
+    wal = WriteAheadLog(str(tmp_path))
+    wal.open()
+    data.upsert_product(NEW_PRODUCT)
+    data.update_stock("3", 7)
+    data.remove_product("1")
+    wal.sync()
+    expected = copy.deepcopy(data.PRODUCTS)
+    wal.close()
+
+    wal, stats = _restart(str(tmp_path), catalog)
+    wal.close()
+    assert data.PRODUCTS == expected
+    assert stats["replayed"] == 3
+
+
+def test_stock_changes_are_logged_compactly(tmp_path, catalog):
+    """Test that stock-only updates log just the id and new stock."""
+    wal = WriteAheadLog(str(tmp_path))
+    wal.open()
+    data.update_stock("2", 11)
+    wal.close()
+    (segment,) = [n for n in os.listdir(tmp_path) if n.startswith("wal-")]
+    assert (tmp_path / segment).read_bytes().endswith(b'["s","2",11]')
+
+
+def test_mutations_wait_for_durability(tmp_path, catalog):
+    """Test that a mutation returns only once its record is fsynced."""
+    wal = WriteAheadLog(str(tmp_path))
+    wal.open()
+    data.update_stock("2", 3)
+    durable = wal.durable_lsn
+    wal.close()
+    assert durable == 1
+
+
+def test_group_commit_batches_fsyncs(tmp_path, catalog):
+    """Test that concurrent writers waiting for durability share fsyncs."""
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0.02, synchronous=False)
+    wal.open()
+
+    async def writer(stock):
+        data.update_stock("4", stock)
+        await wal.commit()
+        return wal.durable_lsn
+
+    async def scenario():
+        return await asyncio.gather(*(writer(stock) for stock in range(200)))
+
+    durable = asyncio.run(scenario())
+    stats = wal.stats()
+    wal.close()
+    assert all(lsn >= i + 1 for i, lsn in enumerate(durable))
+    assert stats["durable_lsn"] == 200
+    assert stats["commits"] < 20
+
+
+def test_failed_log_refuses_changes(tmp_path, catalog):
+    """Test that a failed flusher vetoes changes before they are applied."""
+    wal = WriteAheadLog(str(tmp_path))
+    wal.open()
+    wal._error = OSError("disk full")
+    try:
+        with pytest.raises(RuntimeError):
+            data.update_stock("2", 0)
+        assert data.check_inventory("2")["stock"] == 25
+    finally:
+        wal._error = None
+        wal.close()
+
+
+def test_data_directory_is_locked(tmp_path, catalog):
+    """Test that two logs cannot share a data directory."""
+    wal = WriteAheadLog(str(tmp_path))
+    wal.open()
+    try:
+        with pytest.raises(RuntimeError, match="in use"):
+            WriteAheadLog(str(tmp_path)).open()
+    finally:
+        wal.close()
+    reopened = WriteAheadLog(str(tmp_path))
+    reopened.open()
+    reopened.close()
+
+
+def test_snapshots_compact_the_log(tmp_path, catalog):
+    """Test that checkpoints bound the log replayed at startup."""
+    wal = WriteAheadLog(str(tmp_path), snapshot_every=3)
+    wal.open()
+    for stock in range(7):
+        data.update_stock("2", stock)
+    wal.close()
+
+    files = sorted(os.listdir(tmp_path))
+    assert len([n for n in files if n.startswith("snapshot-")]) == 1
+    assert len([n for n in files if n.startswith("wal-")]) == 1
+
+    wal, stats = _restart(str(tmp_path), catalog)
+    wal.close()
+    assert stats["snapshot_lsn"] == 6
+    assert stats["replayed"] == 1
+    assert data.check_inventory("2")["stock"] == 6
+
+
+def test_torn_tail_is_truncated(tmp_path, catalog):
+    """Test recovery from a record cut short by a crash."""
+    wal = WriteAheadLog(str(tmp_path))
+    wal.open()
+    data.update_stock("1", 1)
+    wal.close()
+    (segment,) = [n for n in os.listdir(tmp_path) if n.startswith("wal-")]
+    with open(tmp_path / segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00partial")
+
+    wal, stats = _restart(str(tmp_path), catalog)
+    data.update_stock("1", 2)
+    wal.close()
+    assert stats["replayed"] == 1
+    assert stats["truncated_bytes"] == 11
+
+    wal, stats = _restart(str(tmp_path), catalog)
+    wal.close()
+    assert stats["replayed"] == 2
+    assert data.check_inventory("1")["stock"] == 2
+
+
+async def _change_and_commit(wal):
+    data.update_stock("3", 42)
+    await wal.commit()
+
+
+def test_app_recovers_from_data_dir(tmp_path, monkeypatch, catalog):
+    """Test that MCP_DATA_DIR enables recovery and logging in the app."""
+    from fastapi.testclient import TestClient
+
+    from mcp_service.server import create_app
+
+    monkeypatch.setenv("MCP_DATA_DIR", str(tmp_path))
+    app = create_app()
+    with TestClient(app) as client:
+        # Changes on the event loop are logged without blocking it
+        assert not app.state.wal.synchronous
+        client.portal.call(_change_and_commit, app.state.wal)
+        assert app.state.wal.durable_lsn == 1
+    data.load_products(copy.deepcopy(catalog))
+
+    app = create_app()
+    with TestClient(app) as client:
+        response = client.get("/api/v1/products/3/inventory")
+    assert response.json()["stock"] == 42
+    assert app.state.recovery["replayed"] == 1
+
+
+@pytest.mark.parametrize("damage", ["corrupt", "delete"])
+def test_log_without_usable_snapshot_is_refused(tmp_path, catalog, damage):
+    """Test that recovery fails rather than replay onto an empty catalog."""
+    wal = WriteAheadLog(str(tmp_path), snapshot_every=3)
+    wal.open()
+    for stock in range(4):
+        data.update_stock("2", stock)
+    wal.close()
+    (snapshot,) = [n for n in os.listdir(tmp_path) if n.startswith("snapshot-")]
+    if damage == "corrupt":
+        (tmp_path / snapshot).write_text("{")
+    else:
+        os.remove(tmp_path / snapshot)
+
+    with pytest.raises(RuntimeError, match="snapshot"):
+        _restart(str(tmp_path), catalog)
+    # No fresh snapshot was written over the gap
+    remaining = [n for n in os.listdir(tmp_path) if n.startswith("snapshot-")]
+    assert remaining == ([snapshot] if damage == "corrupt" else [])
+    # The failed recovery released the directory lock
+    with pytest.raises(RuntimeError, match="snapshot"):
+        WriteAheadLog(str(tmp_path)).open()
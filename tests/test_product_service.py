@@ -3,6 +3,7 @@
 import pytest
 from fastapi.testclient import TestClient
 
+from mcp_service import handlers
 from mcp_service.server import create_app
 
 
@@ -43,11 +44,29 @@ class TestMCPEndpoints:
         assert data["id"] == "test-2"
         assert "capabilities" in data["result"]
         tools = data["result"]["capabilities"]["tools"]
-        assert len(tools) == 3
+        assert len(tools) == 4
         tool_names = [tool["name"] for tool in tools]
         assert "search_products" in tool_names
         assert "get_product_details" in tool_names
         assert "check_inventory" in tool_names
+        assert "facets" in tool_names
+
+    def test_capabilities_message_is_preserialized(self, client, monkeypatch):
+        """Test that the capabilities result is served without a dispatch."""
+
+        async def fail(*args):
+            raise AssertionError("capabilities should not be dispatched")
+
+        monkeypatch.setattr(handlers, "dispatch_mcp_request", fail)
+        response = client.post(
+            "/api/v1/mcp/message",
+            json={"id": 9, "method": "capabilities", "params": {}},
+        )
+        assert response.json() == {
+            "id": 9,
+            "result": {"capabilities": {"tools": handlers.MCP_TOOLS}},
+            "error": None,
+        }
 
     def test_search_products_message(self, client):
         """Test MCP search_products message."""
@@ -84,6 +103,34 @@ class TestMCPEndpoints:
         assert "iPhone 15 Pro" in product_names
         assert "MacBook Air M3" in product_names
 
+    def test_search_products_sort_and_limit(self, client):
+        """Test MCP search_products with sort and limit."""
+        response = client.post(
+            "/api/v1/mcp/message",
+            json={
+                "id": "test-4b",
+                "method": "search_products",
+                "params": {"sort": "-price", "limit": 2},
+            },
+        )
+        data = response.json()
+        assert data["result"]["count"] == 2
+        names = [p["name"] for p in data["result"]["products"]]
+        assert names == ["MacBook Air M3", "iPhone 15 Pro"]
+
+    def test_search_products_invalid_sort(self, client):
+        """Test MCP search_products with an unsupported sort field."""
+        response = client.post(
+            "/api/v1/mcp/message",
+            json={
+                "id": "test-4c",
+                "method": "search_products",
+                "params": {"sort": "stock"},
+            },
+        )
+        data = response.json()
+        assert data["error"]["code"] == -32602
+
     def test_get_product_details_message(self, client):
         """Test MCP get_product_details message."""
         response = client.post(
@@ -161,6 +208,67 @@ class TestMCPEndpoints:
         assert "error" in data
         assert data["error"]["code"] == -32601
 
+    @pytest.mark.parametrize(
+        "body,code",
+        [
+            (b"{not json", -32700),
+            (b'{"method": "ping"}', -32600),
+            (b'{"id": 1, "method": "ping", "params": []}', -32600),
+        ],
+    )
+    def test_malformed_envelope(self, client, body, code):
+        """Test JSON-RPC errors for unparsable and invalid messages."""
+        response = client.post(
+            "/api/v1/mcp/message",
+            content=body,
+            headers={"Content-Type": "application/json"},
+        )
+        assert response.status_code == 200
+        assert response.json()["id"] is None
+        assert response.json()["error"]["code"] == code
+
+    @pytest.mark.parametrize(
+        "method,params,message",
+        [
+            ("search_products", {"limit": -1}, "limit"),
+            ("search_products", {"limit": "many"}, "limit"),
+            ("search_products", {"mode": "regex"}, "mode"),
+            ("search_products", {"query": ["iPhone"]}, "query"),
+            ("check_inventory", {"product_id": 3}, "product_id"),
+            ("facets", {"in_stock_only": "maybe"}, "in_stock_only"),
+        ],
+    )
+    def test_malformed_params_rejected_before_data_access(
+        self, client, monkeypatch, method, params, message
+    ):
+        """Test that typed params validation rejects bad calls with -32602."""
+
+        def fail(*args, **kwargs):
+            raise AssertionError("data accessed for a malformed call")
+
+        for name in ("_run_search", "check_inventory", "get_facets"):
+            monkeypatch.setattr(handlers, name, fail)
+        response = client.post(
+            "/api/v1/mcp/message",
+            json={"id": "bad", "method": method, "params": params},
+        )
+        error = response.json()["error"]
+        assert error["code"] == -32602
+        assert message in error["message"]
+
+    def test_params_are_coerced_to_tool_types(self, client):
+        """Test that well-formed params are parsed into typed values."""
+        response = client.post(
+            "/api/v1/mcp/message",
+            json={
+                "id": "typed",
+                "method": "facets",
+                "params": {"in_stock_only": "false", "category": "Footwear"},
+            },
+        )
+        facets = response.json()["result"]
+        assert [c["category"] for c in facets["categories"]] == ["Footwear"]
+
 
 class TestRESTEndpoints:
     """Test REST API endpoints."""
@@ -0,0 +1,75 @@
+"""Tests for the on-demand profiling hooks."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_service.server import create_app
+from mcp_service.timing import ServerTiming
+
+
+@pytest.fixture
+def admin_client():
+    """Create a test client with the admin surface enabled."""
+    app = create_app(enable_admin=True)
+    return TestClient(app)
+
+
+def test_admin_disabled_by_default(monkeypatch):
+    """Test that the admin routes are not mounted unless opted in."""
+    monkeypatch.delenv("MCP_SERVICE_ADMIN", raising=False)
+    client = TestClient(create_app())
+    assert client.post("/admin/profile?seconds=0.1").status_code == 404
+    response = client.post(
+        "/api/v1/mcp/message", json={"id": 1, "method": "ping", "params": {}}
+    )
+    assert "server-timing" not in response.headers
+
+
+def test_server_timing_header(admin_client):
+    """Test that MCP responses carry a Server-Timing breakdown."""
+    response = admin_client.post(
+        "/api/v1/mcp/message",
+        json={"id": 1, "method": "search_products", "params": {"query": "iPhone"}},
+    )
+    assert response.status_code == 200
+    assert response.json()["result"]["count"] == 1
+    metrics = [m.split(";")[0] for m in response.headers["server-timing"].split(", ")]
+    assert metrics == ["data", "dispatch", "serialize"]
+
+
+def test_server_timing_nested_measurements_do_not_overlap():
+    """Test that inner measurements are excluded from the outer metric."""
+    timing = ServerTiming()
+    with timing.measure("outer"):
+        with timing.measure("inner"):
+            sum(range(10000))
+    assert timing.durations["outer"] < timing.durations["inner"] * 10
+    assert timing.header().startswith("inner;dur=")
+
+
+def test_profile_returns_collapsed_stacks(admin_client):
+    """Test that a profiling session returns flamegraph collapsed stacks."""
+    response = admin_client.post("/admin/profile?seconds=0.2&interval_ms=5")
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert ";" in stack
+
+
+def test_tracemalloc_snapshot_and_diff(admin_client):
+    """Test tracemalloc snapshot and diff endpoints."""
+    assert admin_client.post("/admin/tracemalloc/snapshot").status_code == 409
+    admin_client.post("/admin/tracemalloc/start")
+    try:
+        first = admin_client.post("/admin/tracemalloc/snapshot").json()
+        assert first["snapshot_id"] == 1
+        response = admin_client.get(
+            f"/admin/tracemalloc/diff?base={first['snapshot_id']}"
+        )
+        assert response.status_code == 200
+        assert response.json()["target"] == 2
+        assert admin_client.get("/admin/tracemalloc/diff?base=99").status_code == 404
+    finally:
+        admin_client.post("/admin/tracemalloc/stop")
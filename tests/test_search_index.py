@@ -0,0 +1,103 @@
+"""Tests for the fuzzy trigram/BM25 search index."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_service import data
+from mcp_service.search_index import FuzzyIndex, tokenize, trigrams
+from mcp_service.server import create_app
+
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    return TestClient(create_app())
+
+
+@pytest.fixture
+def index():
+    """Build an index over the sample products."""
+    return FuzzyIndex(data.PRODUCTS)
+
+
+def test_tokenize_and_trigrams():
+    """Test tokenization and padded trigram generation."""
+    assert tokenize("iPhone 15-Pro") == ["iphone", "15", "pro"]
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [("iphon 15", "1"), ("macbok", "2"), ("nkie air max", "3"), ("coffe", "4")],
+)
+def test_typos_find_product(index, query, expected):
+    """Test that misspelled queries rank the intended product first."""
+    assert index.search(query)[0]["id"] == expected
+
+
+def test_description_terms_are_ranked_below_name_terms(index):
+    """Test BM25 weighting: a name match beats a description-only match."""
+    results = index.search("air")
+    assert {r["id"] for r in results} == {"2", "3"}
+    assert all(r["score"] > 0 for r in results)
+    assert results == sorted(results, key=lambda r: -r["score"])
+
+
+def test_category_filter_and_limit(index):
+    """Test category filtering and top-k truncation."""
+    assert [r["id"] for r in index.search("air", "Footwear")] == ["3"]
+    assert len(index.search("pro", limit=1)) == 1
+    assert index.search("zzzz") == []
+
+
+def test_fuzzy_mode_over_mcp(client):
+    """Test the fuzzy mode on the MCP search_products tool."""
+    response = client.post(
+        "/api/v1/mcp/message",
+        json={
+            "id": "f-1",
+            "method": "search_products",
+            "params": {"query": "macbok", "mode": "fuzzy"},
+        },
+    )
+    result = response.json()["result"]
+    assert result["products"][0]["name"] == "MacBook Air M3"
+    assert "score" in result["products"][0]
+
+
+def test_fuzzy_mode_rejects_sort(client):
+    """Test that sort cannot be combined with ranked results."""
+    response = client.post(
+        "/api/v1/mcp/message",
+        json={
+            "id": "f-2",
+            "method": "search_products",
+            "params": {"query": "air", "mode": "fuzzy", "sort": "price"},
+        },
+    )
+    assert response.json()["error"]["code"] == -32602
+
+
+def test_fuzzy_mode_over_rest(client):
+    """Test the fuzzy mode on the REST search route."""
+    response = client.get("/api/v1/products/search?query=iphon&mode=fuzzy")
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == "1"
+    plain = client.get("/api/v1/products/search?query=iPhone").json()
+    assert "score" not in plain[0]
+    assert client.get("/api/v1/products/search?mode=regex").status_code == 422
+
+
+def test_stock_updates_do_not_rebuild_index():
+    """Test that stock-only changes keep the index; content changes rebuild it."""
+    from mcp_service.search_index import get_fuzzy_index
+
+    original = dict(data.get_product_details("1"))
+    index = get_fuzzy_index()
+    try:
+        data.update_stock("1", original["stock"] + 1)
+        assert get_fuzzy_index() is index
+        data.upsert_product(dict(original, name="iPhone 15 Pro Max"))
+        assert get_fuzzy_index() is not index
+    finally:
+        data.upsert_product(original)
@@ -1,5 +1,12 @@
 """Tests for the Product Search MCP server."""
 
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -43,3 +50,99 @@ def test_capabilities_endpoint(client):
     assert "version" in data
     assert data["service"] == "Product Search MCP Service"
     assert "available_categories" in data
+
+
+def test_openapi_schema_generated_once():
+    """Test that apps with the same routes share one OpenAPI schema."""
+    first = create_app().openapi()
+    assert create_app().openapi() is first
+    assert create_app(enable_admin=True).openapi() is not first
+
+
+def test_admin_modules_not_imported_when_disabled():
+    """Test that a plain app does not load the profiling surface at startup."""
+    code = (
+        "import sys\n"
+        "from mcp_service.server import create_app\n"
+        "create_app(enable_admin=False)\n"
+        "print(sorted({'mcp_service.profiling', 'tracemalloc'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_fast_start_warms_up_indexes(monkeypatch):
+    """Test that fast-start mode finishes the warm-up before serving."""
+    from mcp_service import search_index, text_index
+
+    monkeypatch.setattr(search_index._indexes, "index", None)
+    monkeypatch.setattr(text_index._indexes, "index", None)
+    app = create_app(fast_start=True)
+    with TestClient(app) as client:
+        assert search_index._indexes.index is not None
+        assert text_index._indexes.index is not None
+        assert client.get("/ready").status_code == 200
+        assert client.get("/docs").status_code == 404
+        assert client.get("/openapi.json").status_code == 200
+
+
+def test_ready_is_503_until_warm_up_finishes(monkeypatch):
+    """Test that /ready gates traffic on the warm-up."""
+    app = create_app()
+    release = threading.Event()
+
+    async def blocked_replay():
+        await asyncio.to_thread(release.wait, 5)
+
+    monkeypatch.setattr(app.state.warm_up, "_replay", blocked_replay)
+    with TestClient(app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        assert client.get("/health").status_code == 200
+
+        release.set()
+        for _ in range(100):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.01)
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_ready_reports_progress_and_catalog_version():
+    """Test the readiness report once the background warm-up completes."""
+    app = create_app()
+    with TestClient(app) as client:
+        for _ in range(100):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.01)
+        report = response.json()
+
+    assert response.status_code == 200
+    assert report["ready"] is True
+    assert report["progress"] == 1
+    assert report["completed_steps"] == [
+        "fuzzy_index",
+        "text_index",
+        "facets",
+        "capabilities",
+        "hot_queries",
+    ]
+    assert report["warmed_catalog_version"] == report["catalog_version"]
+
+
+def test_warm_up_queries_from_file(tmp_path, monkeypatch):
+    """Test replaying hot queries captured in MCP_WARM_UP_QUERIES."""
+    from mcp_service.warmup import load_warm_up_queries
+
+    queries = [{"method": "check_inventory", "params": {"product_id": "3"}}]
+    path = tmp_path / "queries.json"
+    path.write_text(json.dumps(queries))
+    monkeypatch.setenv("MCP_WARM_UP_QUERIES", str(path))
+    assert load_warm_up_queries() == queries
@@ -0,0 +1,51 @@
+"""Tests for the sharded catalog."""
+
+import asyncio
+
+import pytest
+
+from mcp_service import data
+from mcp_service.sharding import ShardedCatalog, shard_for
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    """Create a three-shard catalog over the sample products."""
+    catalog = ShardedCatalog(3)
+    yield catalog
+    catalog.close()
+
+
+def test_shard_for_is_stable():
+    """Test that shard assignment is deterministic and in range."""
+    assert shard_for("1", 4) == shard_for("1", 4)
+    assert all(0 <= shard_for(str(i), 4) < 4 for i in range(100))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"query": "air"},
+        {"category": "Electronics"},
+        {"sort": "price"},
+        {"sort": "-price", "limit": 2},
+        {"sort": "name", "limit": 3},
+        {"limit": 1},
+    ],
+)
+def test_scatter_gather_matches_single_process(sharded, kwargs):
+    """Test that merged shard results equal the unsharded search."""
+    assert sharded.search_products(**kwargs) == data.search_products(**kwargs)
+
+
+def test_async_search(sharded):
+    """Test the async scatter-gather search."""
+    results = asyncio.run(sharded.asearch_products(sort="-price", limit=1))
+    assert [p["name"] for p in results] == ["MacBook Air M3"]
+
+
+def test_invalid_sort_rejected(sharded):
+    """Test that an unsupported sort field is rejected before fan-out."""
+    with pytest.raises(ValueError):
+        sharded.search_products(sort="stock")
@@ -0,0 +1,89 @@
+"""Tests for the full-text description index."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_service import data
+from mcp_service.server import create_app
+from mcp_service.text_index import (
+    FullTextIndex,
+    _write_varint,
+    decode_postings,
+    parse_query,
+    stem,
+)
+
+
+@pytest.fixture
+def index():
+    """Build an index over the sample products."""
+    return FullTextIndex(data.PRODUCTS)
+
+
+@pytest.mark.parametrize(
+    "word,expected",
+    [("shoes", "shoe"), ("running", "run"), ("designed", "design"), ("glass", "glass")],
+)
+def test_stem(word, expected):
+    """Test the light suffix-stripping stemmer."""
+    assert stem(word) == expected
+
+
+def test_postings_round_trip():
+    """Test delta/varint encoding of documents and positions."""
+    buf = bytearray()
+    for delta, positions in ((3, [0, 200]), (300, [5])):
+        _write_varint(buf, delta)
+        _write_varint(buf, len(positions))
+        previous = 0
+        for position in positions:
+            _write_varint(buf, position - previous)
+            previous = position
+    assert decode_postings(bytes(buf)) == [(3, [0, 200]), (303, [5])]
+
+
+def test_parse_query():
+    """Test parsing of AND, OR and phrase queries with stopwords removed."""
+    assert parse_query('the laptop AND "running shoes" OR chip') == [
+        [((0, "laptop"),), ((0, "run"), (1, "shoe"))],
+        [((0, "chip"),)],
+    ]
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("titanium", ["1"]),
+        ("lightweight chip", ["2"]),
+        ("titanium OR laptop", ["1", "2"]),
+        ('"running shoes"', ["3"]),
+        ('"shoes running"', []),
+        ('"professional grade"', ["4"]),
+        ("the", []),
+    ],
+)
+def test_boolean_and_phrase_queries(index, query, expected):
+    """Test evaluation of boolean and phrase queries."""
+    assert [r["id"] for r in index.search(query)] == expected
+
+
+def test_estimate_cost_counts_postings(index):
+    """Test that query cost grows with the document frequency of its terms."""
+    assert index.estimate_cost("zzzz") == 0
+    assert index.estimate_cost("titanium") == 1
+    assert index.estimate_cost('pro OR "running shoes"') == 4
+
+
+def test_text_mode_over_mcp():
+    """Test the text mode on the MCP search_products tool."""
+    client = TestClient(create_app())
+    response = client.post(
+        "/api/v1/mcp/message",
+        json={
+            "id": "t-1",
+            "method": "search_products",
+            "params": {"query": "design OR chip", "mode": "text", "sort": "-price"},
+        },
+    )
+    products = response.json()["result"]["products"]
+    assert [p["id"] for p in products] == ["2", "1"]
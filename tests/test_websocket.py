@@ -0,0 +1,82 @@
+"""Tests for the multiplexed MCP WebSocket endpoint."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_service import handlers
+from mcp_service.server import create_app
+
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    return TestClient(create_app())
+
+
+def test_multiple_requests_matched_by_id(client):
+    """Test that several requests on one connection all get responses."""
+    with client.websocket_connect("/api/v1/mcp/ws") as ws:
+        ws.send_json({"id": 1, "method": "ping", "params": {}})
+        ws.send_json(
+            {"id": "inv", "method": "check_inventory", "params": {"product_id": "3"}}
+        )
+        ws.send_json({"id": 3, "method": "nope", "params": {}})
+        responses = {r["id"]: r for r in (ws.receive_json() for _ in range(3))}
+
+    assert responses[1]["result"]["message"] == "pong"
+    assert responses["inv"]["result"]["stock"] == 100
+    assert responses[3]["error"]["code"] == -32601
+
+
+def test_responses_complete_out_of_order(client, monkeypatch):
+    """Test that a slow request does not hold up a later fast one."""
+    dispatch = handlers.dispatch_mcp_request
+
+    async def slow_search(request, *args):
+        if request.method == "search_products":
+            await asyncio.sleep(0.2)
+        return await dispatch(request, *args)
+
+    monkeypatch.setattr(handlers, "dispatch_mcp_request", slow_search)
+    with client.websocket_connect("/api/v1/mcp/ws") as ws:
+        ws.send_json({"id": "slow", "method": "search_products", "params": {}})
+        ws.send_json({"id": "fast", "method": "ping", "params": {}})
+        order = [ws.receive_json()["id"] for _ in range(2)]
+    assert order == ["fast", "slow"]
+
+
+def test_malformed_frames(client):
+    """Test JSON-RPC errors for unparsable and invalid frames."""
+    with client.websocket_connect("/api/v1/mcp/ws") as ws:
+        ws.send_text("{not json")
+        assert ws.receive_json()["error"]["code"] == -32700
+        ws.send_text(json.dumps({"method": "ping"}))
+        assert ws.receive_json()["error"]["code"] == -32600
+        ws.send_json({"id": 9, "method": "ping", "params": {}})
+        assert ws.receive_json()["id"] == 9
+
+
+def test_in_flight_limit(client, monkeypatch):
+    """Test that a connection never exceeds its in-flight limit."""
+    monkeypatch.setattr(handlers, "WS_MAX_IN_FLIGHT", 2)
+    dispatch = handlers.dispatch_mcp_request
+    active = peak = 0
+
+    async def tracking(request, *args):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return await dispatch(request, *args)
+
+    monkeypatch.setattr(handlers, "dispatch_mcp_request", tracking)
+    with client.websocket_connect("/api/v1/mcp/ws") as ws:
+        for i in range(6):
+            ws.send_json({"id": i, "method": "ping", "params": {}})
+        ids = sorted(ws.receive_json()["id"] for _ in range(6))
+    assert ids == list(range(6))
+    assert peak == 2